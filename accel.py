@@ -0,0 +1,187 @@
+import bisect
+import math
+from typing import Optional, Sequence, Tuple
+
+# Roll boundaries and notes of the if/else ladder in processAccelData. A
+# roll on a boundary plays the lower band's note, as the ladder checks the
+# bands from the bottom up with inclusive upper bounds.
+ROLL_BOUNDARIES = (-67.5, -45.0, -22.5, 0.0, 22.5, 45.0, 67.5)
+ROLL_NOTES = (60, 62, 64, 65, 67, 69, 71, 72)
+
+# Pitch in degrees below which the volume is 0 and above which it is 127
+PITCH_SILENT = -30.0
+PITCH_FULL = 30.0
+VOLUME_PER_DEGREE = 2.116
+
+# Accelerometer counts per g at the +/-2 g range setSensorSettings selects.
+# atan2 only sees ratios, so angles do not depend on it.
+COUNTS_PER_G = 32768.0 / 2.0
+
+
+def note_for_roll(
+    roll: float,
+    boundaries: Sequence[float] = ROLL_BOUNDARIES,
+    notes: Sequence[int] = ROLL_NOTES,
+) -> int:
+    """MIDI note for a roll angle in degrees."""
+    return notes[bisect.bisect_left(boundaries, roll)]
+
+
+def volume_for_pitch(pitch: float) -> float:
+    """MIDI volume for a pitch angle in degrees, before truncation."""
+    if pitch < PITCH_SILENT:
+        return 0.0
+    if pitch > PITCH_FULL:
+        return 127.0
+    return (pitch - PITCH_SILENT) * VOLUME_PER_DEGREE
+
+
+def roll_pitch(x: float, y: float, z: float) -> Tuple[float, float]:
+    """Roll and pitch in degrees from one accelerometer reading."""
+    roll = math.atan2(y, z) * 180.0 / math.pi
+    pitch = math.atan2(-x, math.sqrt(y * y + z * z)) * 180.0 / math.pi
+    return roll, pitch
+
+
+class NoteQuantizer:
+    """Decide note changes with hysteresis bands and a minimum dwell time.
+
+    Values are positions on a ladder of bands, such as roll in degrees
+    between ROLL_BOUNDARIES. The note only leaves its band once the value
+    is more than hysteresis past the band's edge, and only after the new
+    band has held for min_dwell seconds of samples at rate. Each change
+    the plain ladder would have made and this one did not saves a note-off
+    and note-on pair, counted in suppressed.
+    """
+
+    def __init__(
+        self,
+        boundaries: Sequence[float] = ROLL_BOUNDARIES,
+        notes: Sequence[int] = ROLL_NOTES,
+        hysteresis: float = 3.0,
+        min_dwell: float = 0.03,
+        rate: float = 100.0,
+    ):
+        if len(notes) != len(boundaries) + 1:
+            raise ValueError(
+                f"{len(boundaries)} boundaries need {len(boundaries) + 1} notes,"
+                f" got {len(notes)}"
+            )
+        self.boundaries = tuple(boundaries)
+        self.notes = tuple(notes)
+        self.hysteresis = hysteresis
+        self.dwell_samples = max(1, math.ceil(min_dwell * rate))
+        self.changes = 0
+        self.plain_changes = 0
+        self.reset()
+
+    @classmethod
+    def for_notes(
+        cls,
+        notes: Sequence[int] = ROLL_NOTES,
+        hysteresis: float = 0.25,
+        min_dwell: float = 0.03,
+        rate: float = 100.0,
+    ) -> "NoteQuantizer":
+        """Quantizer over note values, with edges halfway between the notes.
+
+        For boards that only send notes. Whole notes always clear a
+        hysteresis below 0.5, so on them only the dwell time acts; a
+        smoothed, fractional note gets the hysteresis band as well.
+        """
+        edges = [(a + b) / 2 for a, b in zip(notes, notes[1:])]
+        return cls(edges, notes, hysteresis, min_dwell, rate)
+
+    def reset(self):
+        """Forget the current note, the next value sets it straight away."""
+        self.band: Optional[int] = None
+        self._plain: Optional[int] = None
+        self._candidate: Optional[int] = None
+        self._held = 0
+
+    @property
+    def suppressed(self) -> int:
+        """MIDI messages not sent: a note-off and a note-on per change avoided."""
+        return 2 * max(0, self.plain_changes - self.changes)
+
+    def __call__(self, value: float) -> int:
+        boundaries = self.boundaries
+        plain = bisect.bisect_left(boundaries, value)
+        if plain != self._plain:
+            if self._plain is not None:
+                self.plain_changes += 1
+            self._plain = plain
+        band = self.band
+        if band is None:
+            self.band = plain
+            return self.notes[plain]
+        if (band < len(boundaries) and value > boundaries[band] + self.hysteresis) or (
+            band > 0 and value < boundaries[band - 1] - self.hysteresis
+        ):
+            if plain != self._candidate:
+                self._candidate = plain
+                self._held = 0
+            self._held += 1
+            if self._held >= self.dwell_samples:
+                self.band = plain
+                self.changes += 1
+                self._candidate = None
+        else:
+            self._candidate = None
+        return self.notes[self.band]
+
+
+class AccelMapper:
+    """Map raw accelerometer x/y/z counts to (note, velocity) on the host.
+
+    Does what processAccelData does on the board, but at the sensor's full
+    resolution and with a roll ladder that can change without a firmware
+    rebuild. sample() is the scalar path for live readings, samples() maps
+    NumPy arrays of readings in one go. With a NoteQuantizer over roll,
+    notes change with its hysteresis and dwell time instead of at the
+    plain boundaries.
+    """
+
+    def __init__(
+        self,
+        boundaries: Sequence[float] = ROLL_BOUNDARIES,
+        notes: Sequence[int] = ROLL_NOTES,
+        quantizer: Optional[NoteQuantizer] = None,
+    ):
+        if len(notes) != len(boundaries) + 1:
+            raise ValueError(
+                f"{len(boundaries)} roll boundaries need {len(boundaries) + 1} notes,"
+                f" got {len(notes)}"
+            )
+        if list(boundaries) != sorted(boundaries):
+            raise ValueError("roll boundaries must be in ascending order")
+        self.boundaries = tuple(boundaries)
+        self.notes = tuple(notes)
+        self.quantizer = quantizer
+
+    def sample(self, x: int, y: int, z: int) -> Tuple[int, int]:
+        """Map one reading to a (note, velocity) pair."""
+        roll, pitch = roll_pitch(x, y, z)
+        if self.quantizer is not None:
+            return self.quantizer(roll), int(volume_for_pitch(pitch))
+        return (
+            self.notes[bisect.bisect_left(self.boundaries, roll)],
+            int(volume_for_pitch(pitch)),
+        )
+
+    def samples(self, x, y, z):
+        """Map arrays of readings to arrays of notes and velocities."""
+        import numpy as np
+
+        x, y, z = (np.asarray(axis, np.float64) for axis in (x, y, z))
+        roll = np.arctan2(y, z) * 180.0 / np.pi
+        pitch = np.arctan2(-x, np.sqrt(y * y + z * z)) * 180.0 / np.pi
+        if self.quantizer is not None:
+            # The quantizer's state runs from one reading to the next
+            notes = np.array([self.quantizer(r) for r in roll.tolist()], np.int64)
+        else:
+            notes = np.asarray(self.notes)[np.searchsorted(self.boundaries, roll, "left")]
+        volume = (pitch - PITCH_SILENT) * VOLUME_PER_DEGREE
+        volume[pitch < PITCH_SILENT] = 0.0
+        volume[pitch > PITCH_FULL] = 127.0
+        return notes, volume.astype(np.int64)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+import serial
+
+from framing import BINARY
+from midimaker import MidiController
+
+
+class AsyncMidiController(MidiController):
+    """MidiController driven by an asyncio event loop instead of a blocking loop.
+
+    The serial port is opened non-blocking and watched with loop.add_reader,
+    so one event loop can drive several controllers alongside other tasks.
+    This needs a selector based loop on a POSIX serial device (Linux, macOS).
+    Stop it with power_off() or by cancelling the task.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def power_off(self):
+        super().power_off()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def read_blocks(self, ser: serial.Serial) -> AsyncIterator[bytes]:
+        """Yield blocks of complete lines as the port becomes readable."""
+        loop = asyncio.get_running_loop()
+        readable = self._wakeup = asyncio.Event()
+        loop.add_reader(ser.fileno(), readable.set)
+        try:
+            while self.powered:
+                await readable.wait()
+                readable.clear()
+                if not self.powered:
+                    break
+                try:
+                    chunk = ser.read(ser.in_waiting)
+                except serial.SerialException:
+                    raise
+                except OSError as e:
+                    # in_waiting fails with a plain OSError when the board hangs up
+                    raise serial.SerialException(f"read failed: {e}") from e
+                if self.latency is not None:
+                    self.latency.mark_read()
+                if self.capture is not None and chunk:
+                    self.capture.write(chunk)
+                block = self.feed(chunk)
+                if block:
+                    yield block
+        finally:
+            loop.remove_reader(ser.fileno())
+            self._wakeup = None
+
+    def open_serial(self, baudrate: Optional[int] = None) -> serial.Serial:
+        """Open the serial port for non-blocking reads."""
+        return self.serial_config.open(self.serial_port, baudrate, timeout=0)
+
+    async def samples(self, baudrate: Optional[int] = None) -> AsyncIterator[Tuple[int, int]]:
+        """Yield parsed (note, velocity) samples without sending any MIDI."""
+        with self.open_serial(baudrate) as ser:
+            async for block in self.read_blocks(ser):
+                for sample in self.parse_batch(block):
+                    yield sample
+
+    async def run(
+        self,
+        baudrate: Optional[int] = None,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+    ):
+        """Read, parse and send MIDI until powered off, cancelled or the port fails."""
+        start = time.monotonic()
+        try:
+            with self.open_serial(baudrate) as ser:
+                print(f"Connected to serial port: {self.serial_port}")
+                async for block in self.read_blocks(ser):
+                    self.send_samples(
+                        self.parse_batch(block), coalesce, keep_note_changes
+                    )
+        except serial.SerialException as e:
+            print(f"Serial port error: {e}")
+        finally:
+            if self.protocol == BINARY:
+                print(f"Link stats: {self.link_stats(time.monotonic() - start)}")
+            if self.latency is not None:
+                print(self.latency.report())
+            self.close()
@@ -0,0 +1,595 @@
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
+from typing import Dict, Optional, Tuple
+
+from midi_backends import NullBackend
+from serial_parser import LineParser, strip_ansi
+
+# Lines as readline returns them from processAccelData: printFloat wraps
+# each value in colour codes, and the reset after the newline starts the
+# next line, as simulator.py prints them
+SAMPLE_LINES = [
+    b"0134 \x1b[30m60.0 \x1b[0m\x1b[30m64.0\n",
+    b"\x1b[0m0134 \x1b[30m62.0 \x1b[0m\x1b[30m127.0\n",
+    b"\x1b[0m134 \x1b[30m71.0 \x1b[0m\x1b[30m0.0\r\n",
+    b"\x1b[0m0134 \x1b[30m72.0 \x1b[0m\x1b[30m98.4\n",
+] * 25
+
+
+def synthetic_capture(lines: int = 10000, noisy_every: int = 10) -> list:
+    """Serial lines shaped like a board capture, with ANSI noise on some of them."""
+    capture = []
+    for i in range(lines):
+        note = (60, 62, 64, 65, 67, 69, 71, 72)[i // 50 % 8]
+        velocity = i * 7 % 1270 / 10
+        if i % noisy_every == 0:
+            capture.append(b"\x1b[30m%.1f \x1b[30m%.1f\x1b[0m\r\n" % (note, velocity))
+        else:
+            capture.append(b"%.1f %.1f\r\n" % (note, velocity))
+    return capture
+
+
+def legacy_parse(line: bytes) -> Optional[Tuple[int, int]]:
+    """The original decode/replace/regex/float chain from process_serial_data."""
+    raw_data = line.decode("utf-8").strip()
+    if raw_data:
+        data = raw_data.replace("0134", "").replace("134", "")
+        ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+        data = ansi_escape.sub("", data)
+        parts = data.split()
+        if len(parts) >= 2:
+            return int(float(parts[0])), int(float(parts[1]))
+    return None
+
+
+def reference_ns(number: int = 2000) -> float:
+    """Per-line time of the legacy parsing chain, a yardstick for this host's speed."""
+
+    def run_legacy():
+        for line in SAMPLE_LINES:
+            legacy_parse(line)
+
+    return min(timeit.repeat(run_legacy, number=number, repeat=3)) * 1e9 / (
+        number * len(SAMPLE_LINES)
+    )
+
+
+def bench_parser(number: int = 20000) -> Dict[str, float]:
+    """Compare the bytes fast-path parser with the legacy parsing chain."""
+    parser = LineParser()
+    for line in SAMPLE_LINES:
+        assert parser.parse(line) == legacy_parse(line), line
+    block = b"".join(SAMPLE_LINES).rstrip(b"\n")
+    assert parser.parse_many(block)[0] == [legacy_parse(l) for l in SAMPLE_LINES]
+
+    def run_legacy():
+        for line in SAMPLE_LINES:
+            legacy_parse(line)
+
+    def run_lines():
+        for line in SAMPLE_LINES:
+            parser.parse(line)
+
+    def run_block():
+        parser.parse_many(block)
+
+    per_line = 1e9 / (number * len(SAMPLE_LINES))
+    legacy = min(timeit.repeat(run_legacy, number=number, repeat=5))
+    lines = min(timeit.repeat(run_lines, number=number, repeat=5))
+    block = min(timeit.repeat(run_block, number=number, repeat=5))
+    return {
+        "legacy_ns": legacy * per_line,
+        "lines_ns": lines * per_line,
+        "block_ns": block * per_line,
+    }
+
+
+def bench_array_parser(lines: int = 200000) -> Dict[str, float]:
+    """Compare the NumPy batch parser with parsing a large log line by line."""
+    parser = LineParser()
+    capture = synthetic_capture(lines)
+    block = b"".join(capture)
+    notes, velocities, valid = parser.parse_array(block)
+    assert valid.all()
+    assert list(zip(notes.tolist(), velocities.tolist())) == [
+        legacy_parse(line) for line in capture
+    ]
+
+    def run_legacy():
+        for line in capture:
+            legacy_parse(line)
+
+    def run_lines():
+        for line in capture:
+            parser.parse(line)
+
+    legacy = min(timeit.repeat(run_legacy, number=1, repeat=3))
+    scalar = min(timeit.repeat(run_lines, number=1, repeat=3))
+    array = min(timeit.repeat(lambda: parser.parse_array(block), number=1, repeat=3))
+    return {
+        "legacy_ns": legacy * 1e9 / lines,
+        "lines_ns": scalar * 1e9 / lines,
+        "array_ns": array * 1e9 / lines,
+        "speedup_vs_legacy_ratio": legacy / array,
+    }
+
+
+def bench_framing(samples: int = 20000) -> Dict[str, float]:
+    """Compare text lines with binary frames: wire bytes and decode cost per sample."""
+    from framing import FrameDecoder, SequenceCounter, encode_frame
+
+    text = b"".join(synthetic_capture(samples))
+    parsed = LineParser().parse_many(text.rstrip(b"\n"))[0]
+    frames = b"".join(
+        encode_frame(i, note, velocity) for i, (note, velocity) in enumerate(parsed)
+    )
+    assert FrameDecoder().decode(frames)[0] == parsed
+    # A duplicate next to a gap, and a swap, hidden inside one chunk
+    for tail, expected in (
+        ((5, 6, 6, 8), {"lost": 1, "gaps": 1, "duplicates": 1, "reordered": 0}),
+        ((5, 7, 6, 8), {"lost": 0, "gaps": 1, "duplicates": 0, "reordered": 1}),
+    ):
+        counter = SequenceCounter()
+        counter.track(bytes(range(5)))
+        counter.track(bytes(tail))
+        stats = counter.stats()
+        assert {key: stats[key] for key in expected} == expected, (tail, stats)
+    text_chunks = [text[i : i + 512] for i in range(0, len(text), 512)]
+    frame_chunks = [frames[i : i + 512] for i in range(0, len(frames), 512)]
+
+    def run_text():
+        parser = LineParser()
+        buffer = bytearray()
+        for chunk in text_chunks:
+            buffer += chunk
+            end = buffer.rfind(b"\n")
+            parser.parse_many(bytes(buffer[:end]))
+            del buffer[: end + 1]
+
+    def run_binary():
+        decoder = FrameDecoder()
+        for chunk in frame_chunks:
+            decoder.decode(chunk)
+
+    text_time = min(timeit.repeat(run_text, number=1, repeat=5))
+    binary_time = min(timeit.repeat(run_binary, number=1, repeat=5))
+    return {
+        "text_ns": text_time * 1e9 / samples,
+        "binary_ns": binary_time * 1e9 / samples,
+        "text_bytes": len(text) / samples,
+        "binary_bytes": len(frames) / samples,
+    }
+
+
+def bench_ansi(number: int = 5) -> Dict[str, float]:
+    """Compare per-call regex compilation with the precompiled ANSI stripper."""
+    capture = synthetic_capture()
+    text = [line.decode("utf-8") for line in capture]
+
+    def run_legacy():
+        for line in text:
+            re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])").sub("", line)
+
+    def run_text():
+        for line in text:
+            strip_ansi(line)
+
+    def run_bytes():
+        for line in capture:
+            strip_ansi(line)
+
+    per_line = 1e9 / (number * len(capture))
+    legacy = min(timeit.repeat(run_legacy, number=number, repeat=5))
+    text = min(timeit.repeat(run_text, number=number, repeat=5))
+    raw = min(timeit.repeat(run_bytes, number=number, repeat=5))
+    return {
+        "legacy_ns": legacy * per_line,
+        "str_ns": text * per_line,
+        "bytes_ns": raw * per_line,
+    }
+
+
+def bench_message_cache(rounds: int = 200) -> Dict[str, float]:
+    """Check that cached note-on/note-off lookups allocate nothing after warm-up."""
+    from midimaker import MidiMessageCache
+
+    cache = MidiMessageCache(NullBackend())
+    notes = (60, 62, 64, 65, 67, 69, 71, 72)
+    velocities = tuple(range(0, 128, 8))
+    per_round = len(notes) * (len(velocities) + 1)
+    # Keep every returned message alive so freshly built ones would show up
+    sent = [None] * (per_round * (rounds + 1))
+
+    def run(i):
+        for note in notes:
+            for velocity in velocities:
+                sent[i] = cache.note_on(1, note, velocity)
+                i += 1
+            sent[i] = cache.note_off(1, note)
+            i += 1
+
+    run(0)  # warm-up fills the cache
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for r in range(1, rounds + 1):
+        run(r * per_round)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    new_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    # Blocks allocated by the send path itself, wherever the caller's are
+    send_path = [
+        tracemalloc.Filter(True, "*midimaker.py"),
+        tracemalloc.Filter(True, "*midi_backends.py"),
+    ]
+    leaks = [
+        stat
+        for stat in after.filter_traces(send_path).compare_to(
+            before.filter_traces(send_path), "traceback"
+        )
+        if stat.count_diff > 0
+    ]
+    assert not leaks, f"cached messages allocated after warm-up: {leaks[:3]}"
+    return {"blocks_per_message": new_blocks / (rounds * per_round)}
+
+
+def bench_send_path(number: int = 20000) -> Dict[str, float]:
+    """Time send_midi_messages decisions against the null MIDI backend."""
+    from midimaker import MidiController
+
+    controller = MidiController("bench", backend=NullBackend())
+    capture = b"".join(synthetic_capture(1000)).rstrip(b"\n")
+    samples, _ = LineParser().parse_many(capture)
+
+    def run():
+        for note, velocity in samples:
+            controller.current_midi_value = note
+            controller.current_velocity = velocity
+            controller.send_midi_messages()
+
+    elapsed = min(timeit.repeat(run, number=number // len(samples), repeat=5))
+    return {"sample_ns": elapsed * 1e9 / (number // len(samples) * len(samples))}
+
+
+def bench_debug_output(number: int = 20000) -> Dict[str, float]:
+    """Compare per-sample print() with the guarded, sampled debug log."""
+    from midimaker import MidiController
+
+    controller = MidiController("bench", backend=NullBackend())
+    handler = logging.FileHandler(os.devnull)
+    logging.getLogger("theremini").addHandler(handler)
+    devnull = open(os.devnull, "w")
+
+    def run_print():
+        for i in range(number):
+            controller.apply_sample(60 + i % 2, 64)
+            note, velocity = controller.current_midi_value, controller.current_velocity
+            print(f"MIDI Note: {note}, Velocity: {velocity}", file=devnull)
+
+    def run_logged():
+        for i in range(number):
+            controller.apply_sample(60 + i % 2, 64)
+
+    results = {}
+    try:
+        results["print_ns"] = min(timeit.repeat(run_print, number=1, repeat=3))
+        for name, enabled, every in (
+            ("off_ns", False, 1),
+            ("every_100_ns", True, 100),
+            ("every_sample_ns", True, 1),
+        ):
+            controller.set_debug(enabled, every)
+            results[name] = min(timeit.repeat(run_logged, number=1, repeat=3))
+    finally:
+        controller.set_debug(False)
+        logging.getLogger("theremini").removeHandler(handler)
+        handler.close()
+        devnull.close()
+    return {name: elapsed * 1e9 / number for name, elapsed in results.items()}
+
+
+def bench_pipeline(lines: int = 50000) -> Dict[str, float]:
+    """Full feed -> parse -> send throughput from memory into the null backend."""
+    from midimaker import MidiController
+
+    controller = MidiController("bench", backend=NullBackend())
+    capture = b"".join(synthetic_capture(lines))
+    chunks = [capture[i : i + 512] for i in range(0, len(capture), 512)]
+
+    def run():
+        for chunk in chunks:
+            controller.handle_batch(controller.feed(chunk))
+
+    elapsed = min(timeit.repeat(run, number=1, repeat=3))
+    return {"samples_per_s": lines / elapsed}
+
+
+def bench_simulator(rate: float = 10000.0, seconds: float = 2.0) -> Dict[str, float]:
+    """Live pipeline against the pty simulator: keep-up ratio and CPU per sample."""
+    from serial_config import SerialConfig, measure_throughput
+
+    result = measure_throughput(SerialConfig(timeout=0.05), rate, seconds)
+    return {
+        "kept_up_ratio": result["kept_up_ratio"],
+        "cpu_ns_per_sample": result["cpu_ns_per_sample"],
+    }
+
+
+def bench_read_modes(rate: float = 1000.0, seconds: float = 2.0) -> Dict[str, float]:
+    """Line against batch reads of the simulator: CPU per sample and read to send p99."""
+    from serial_config import SerialConfig, measure_throughput
+
+    results = {}
+    for mode, batch in (("line", False), ("batch", True)):
+        result = measure_throughput(
+            SerialConfig(timeout=0.05), rate, seconds, batch=batch, track_latency=True
+        )
+        results[f"{mode}_cpu_ns_per_sample"] = result["cpu_ns_per_sample"]
+        results[f"{mode}_read_to_send_p99_us"] = result["read_to_send_p99_us"]
+    return results
+
+
+def bench_reconnect(rate: float = 500.0) -> Dict[str, float]:
+    """Hang up a pty board mid-stream in every read mode and time the way back."""
+    from midimaker import MidiController
+    from simulator import SimulatedBoard
+
+    class Controller(MidiController):
+        # The board comes back on a new pty, as it would under a new port name
+        replacement: Optional[str] = None
+        hang_up: Optional[SimulatedBoard] = None
+        samples = 0
+
+        def read_batch(self, ser):
+            # Hang up between reads, so in_waiting is the first call to fail
+            board, self.hang_up = self.hang_up, None
+            if board is not None:
+                board.close()
+                hung_up.set()
+            return super().read_batch(ser)
+
+        def wait_for_device(self, delay):
+            delay = super().wait_for_device(delay)
+            if self.replacement is not None:
+                self.serial_port = self.replacement
+            return delay
+
+        def apply_sample(self, *sample):
+            self.samples += 1
+            super().apply_sample(*sample)
+
+    worst = 0.0
+    for mode in ("line", "batch", "threaded"):
+        board = SimulatedBoard(rate, "scale", seed=1).start()
+        controller = Controller(board.port, backend=NullBackend())
+        hung_up = threading.Event()
+        resumed = []
+
+        def hang_up():
+            time.sleep(0.3)
+            if mode == "line":
+                board.close()
+                hung_up.set()
+            else:
+                controller.hang_up = board
+            hung_up.wait(5.0)
+            lost = time.monotonic()
+            time.sleep(0.1)
+            resumed.append(SimulatedBoard(rate, "scale", seed=2).start())
+            controller.replacement = resumed[0].port
+            before = controller.samples
+            deadline = time.monotonic() + 5.0
+            while controller.samples == before and time.monotonic() < deadline:
+                time.sleep(0.001)
+            resumed.append(time.monotonic() - lost)
+            controller.power_off()
+
+        thread = threading.Thread(target=hang_up)
+        thread.start()
+        controller.process_serial_data(
+            timeout=0.05,
+            batch=mode == "batch",
+            threaded=mode == "threaded",
+            reconnect=True,
+        )
+        thread.join()
+        resumed[0].close()
+        assert controller.reconnects == 1, f"{mode}: {controller.reconnects} reconnects"
+        assert resumed[1] < 5.0, f"{mode}: no samples after reconnecting"
+        worst = max(worst, resumed[1])
+    return {"worst_resume_ms": worst * 1000}
+
+
+def bench_replay(lines: int = 50000) -> Dict[str, float]:
+    """Replay a capture file as fast as possible through the null backend."""
+    import tempfile
+
+    from capture import CaptureWriter
+    from midimaker import MidiController
+
+    capture = b"".join(synthetic_capture(lines))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.tmcap")
+        with CaptureWriter(path) as writer:
+            for i in range(0, len(capture), 512):
+                writer.write(capture[i : i + 512], i * 1000 + 1)
+        runs = [
+            MidiController("bench", backend=NullBackend()).replay(path, speed=0)
+            for _ in range(3)
+        ]
+    return {"samples_per_s": max(run["samples_per_s"] for run in runs)}
+
+
+def bench_memory(lines: int = 20000) -> Dict[str, float]:
+    """Peak and retained memory while pushing a capture through the pipeline."""
+    from midimaker import MidiController
+
+    controller = MidiController("bench", backend=NullBackend())
+    capture = b"".join(synthetic_capture(lines))
+    chunks = [capture[i : i + 512] for i in range(0, len(capture), 512)]
+    controller.handle_batch(controller.feed(chunks[0]))  # warm-up
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    for chunk in chunks[1:]:
+        controller.handle_batch(controller.feed(chunk))
+    end, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "peak_bytes": peak - start,
+        "retained_bytes_per_sample": (end - start) / lines,
+    }
+
+
+BENCHMARKS = {
+    "parser": bench_parser,
+    "array_parser": bench_array_parser,
+    "framing": bench_framing,
+    "ansi": bench_ansi,
+    "message_cache": bench_message_cache,
+    "send_path": bench_send_path,
+    "debug_output": bench_debug_output,
+    "pipeline": bench_pipeline,
+    "simulator": bench_simulator,
+    "read_modes": bench_read_modes,
+    "reconnect": bench_reconnect,
+    "replay": bench_replay,
+    "memory": bench_memory,
+}
+
+# Metric name suffixes where a larger value is an improvement
+HIGHER_IS_BETTER = ("_per_s", "_ratio")
+# Differences below this are noise whatever the baseline, e.g. near-zero counts
+ABSOLUTE_SLACK = 0.01
+
+
+def _host_scaled(metric: str) -> bool:
+    """CPU timings and rates, which move with the speed of the host."""
+    return "_ns" in metric or metric.endswith("_per_s")
+
+
+def _gated(metric: str) -> bool:
+    # legacy_* time the old chains as references, and tail latency on a
+    # shared host is scheduler noise; both are reported but never gated
+    return not metric.startswith("legacy_") and "_p99_" not in metric
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions beyond tolerance (a fraction) of the baseline values.
+
+    Timings and rates are compared relative to reference_ns(), taken just
+    before each benchmark in both runs, so a host that is busier or slower
+    than the baseline's does not show up as a regression. Reported values
+    are scaled to the baseline host's speed.
+    """
+    regressions = []
+    references = report.get("references", {})
+    base_references = baseline.get("references", {})
+    for bench, metrics in report["results"].items():
+        if bench in references and bench in base_references:
+            # How many times slower this run's host was than the baseline's
+            slowdown = references[bench] / base_references[bench]
+        else:
+            slowdown = 1.0
+        for metric, value in metrics.items():
+            base = baseline["results"].get(bench, {}).get(metric)
+            if base is None or not _gated(metric):
+                continue
+            if metric.endswith("_per_s"):
+                value *= slowdown
+            elif _host_scaled(metric):
+                value /= slowdown
+            if abs(value - base) < ABSOLUTE_SLACK:
+                continue
+            worse = base - value if metric.endswith(HIGHER_IS_BETTER) else value - base
+            if (worse / abs(base) if base else worse) > tolerance:
+                regressions.append(f"{bench}.{metric}: {value:.3f} vs {base:.3f} baseline")
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Controller pipeline benchmarks")
+    parser.add_argument("names", nargs="*", help=f"any of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument(
+        "--baseline",
+        default=os.path.join(os.path.dirname(__file__), "benchmarks", "baseline.json"),
+        help="baseline JSON to compare against",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as the new baseline"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.3, help="allowed slowdown, as a fraction"
+    )
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}'")
+
+    results = {}
+    references = {}
+    for name in args.names or BENCHMARKS:
+        references[name] = reference_ns()
+        results[name] = BENCHMARKS[name]()
+        for metric, value in results[name].items():
+            print(f"{name + '.' + metric:<40} {value:>14.3f}")
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "references": references,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    host = (report["python"], report["machine"])
+    if host != (baseline.get("python"), baseline.get("machine")):
+        print(
+            f"Baseline is from Python {baseline.get('python')}"
+            f" on {baseline.get('machine')}, not comparing;"
+            " run with --save-baseline on this host"
+        )
+        return
+    regressions = compare(report, baseline, args.tolerance)
+    flagged = sorted({regression.split(".", 1)[0] for regression in regressions})
+    if flagged:
+        # A shared host stalls now and then, only a repeated regression counts
+        print(f"Re-running {', '.join(flagged)} to confirm")
+        rerun = {"references": {}, "results": {}}
+        for name in flagged:
+            rerun["references"][name] = reference_ns()
+            rerun["results"][name] = BENCHMARKS[name]()
+        regressions = compare(rerun, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import mmap
+import os
+import struct
+import time
+from typing import Iterable, Iterator, Tuple
+
+# File starts with MAGIC, then one record per serial chunk: RECORD header
+# (monotonic timestamp in ns, payload length) followed by the raw bytes
+MAGIC = b"TMCAP001"
+RECORD = struct.Struct("<QI")
+
+
+class CaptureWriter:
+    """Append-only recorder of raw serial chunks with nanosecond timestamps.
+
+    Records are collected in memory and written in batches of flush_bytes,
+    or by the first write() that comes flush_interval seconds after the
+    last flush, without fsync, so the hot path only pays for a timestamp
+    and a bytearray append. The interval is only checked on write(), so
+    once the board goes quiet the tail waits for the next chunk, flush()
+    or close(). An existing capture is appended to, after cutting off a
+    record left partial by a crash; any other existing file raises
+    ValueError.
+    """
+
+    def __init__(self, path: str, flush_bytes: int = 1 << 16, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval_ns = int(flush_interval * 1e9)
+        self.file = open(path, "ab")
+        try:
+            self._check_existing()
+        except ValueError:
+            self.file.close()
+            raise
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.records = 0
+        self.bytes = 0
+        self._pending = bytearray()
+        self._last_flush_ns = time.monotonic_ns()
+
+    def _check_existing(self):
+        """Make sure new records land right after the last complete one."""
+        size = self.file.tell()
+        if not size:
+            return
+        with open(self.path, "rb") as f:
+            head = f.read(len(MAGIC))
+            if head != MAGIC[: len(head)]:
+                raise ValueError(
+                    f"{self.path} is not a capture file, not appending to it"
+                )
+            end = len(head)
+            if end == len(MAGIC):
+                # Walk the record headers to the end of the last whole record
+                while True:
+                    header = f.read(RECORD.size)
+                    if len(header) < RECORD.size:
+                        break
+                    length = RECORD.unpack(header)[1]
+                    if end + RECORD.size + length > size:
+                        break
+                    end += RECORD.size + length
+                    f.seek(end)
+            else:
+                # Cut short while writing MAGIC, start the file over
+                end = 0
+        if end < size:
+            print(
+                f"Capture {self.path} ends in a partial record,"
+                f" dropping its last {size - end} bytes"
+            )
+            self.file.truncate(end)
+            self.file.seek(end)
+
+    def write(self, chunk: bytes, timestamp_ns: int = 0):
+        """Record one raw chunk, stamped now unless a timestamp is given."""
+        now = timestamp_ns or time.monotonic_ns()
+        pending = self._pending
+        pending += RECORD.pack(now, len(chunk))
+        pending += chunk
+        self.records += 1
+        self.bytes += len(chunk)
+        if (
+            len(pending) >= self.flush_bytes
+            or now - self._last_flush_ns >= self.flush_interval_ns
+        ):
+            self.flush(now)
+
+    def flush(self, now: int = 0):
+        """Hand everything pending to the OS."""
+        if self._pending:
+            self.file.write(self._pending)
+            self._pending.clear()
+        self.file.flush()
+        self._last_flush_ns = now or time.monotonic_ns()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureReader:
+    """Memory-mapped reader over a capture file.
+
+    Records are sliced out of the mapping one at a time, so captures of any
+    length replay without being loaded into memory. A record cut short by
+    a crash while recording ends the iteration and sets truncated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a capture file")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.truncated = False
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        """Yield (timestamp_ns, chunk) records in recording order."""
+        data = self.map
+        end = len(data)
+        offset = len(MAGIC)
+        header = RECORD.size
+        while offset < end:
+            if offset + header > end:
+                self.truncated = True
+                return
+            timestamp, length = RECORD.unpack_from(data, offset)
+            offset += header
+            if offset + length > end:
+                self.truncated = True
+                return
+            yield timestamp, data[offset : offset + length]
+            offset += length
+
+    def close(self):
+        if not self.map.closed:
+            self.map.close()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def paced(records: Iterable[Tuple[int, bytes]], speed: float = 1.0) -> Iterator[bytes]:
+    """Yield recorded chunks on their original schedule, speed times faster.
+
+    A speed of 0 yields them as fast as they are consumed.
+    """
+    start = first = None
+    for timestamp, chunk in records:
+        if speed > 0:
+            if first is None:
+                first, start = timestamp, time.monotonic_ns()
+            else:
+                delay = (timestamp - first) / speed - (time.monotonic_ns() - start)
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+        yield chunk
+
+
+def is_capture(path: str) -> bool:
+    """Whether a file starts like a capture written by CaptureWriter."""
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def main():
+    import argparse
+    import logging
+
+    from midi_backends import create_backend
+    from midimaker import MidiController
+
+    parser = argparse.ArgumentParser(description="Replay a serial capture to MIDI")
+    parser.add_argument("path", help="capture written by MidiController.start_capture")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="playback speed, 0 for as fast as possible"
+    )
+    parser.add_argument("--backend", default="rtmidi", help="MIDI backend name")
+    parser.add_argument("--channel", type=int, default=0, help="0-based MIDI channel")
+    parser.add_argument("--latency", action="store_true", help="report send latency")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    controller = MidiController(args.path, args.channel, create_backend(args.backend))
+    if args.latency:
+        controller.track_latency()
+    stats = controller.replay(args.path, args.speed)
+    print(
+        f"Replayed {stats['chunks']} chunks, {stats['samples']} samples"
+        f" in {stats['seconds']:.2f} s ({stats['samples_per_s']:.0f} samples/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
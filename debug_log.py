@@ -0,0 +1,40 @@
+import logging
+import time
+
+logger = logging.getLogger("theremini")
+
+
+class RateLimitedLog:
+    """Log through the theremini logger, keeping only some of the messages.
+
+    Only every Nth call is considered, and of those at most one per interval
+    seconds is logged. Calls that are skipped are counted in suppressed.
+    """
+
+    def __init__(
+        self,
+        level: int = logging.DEBUG,
+        every: int = 1,
+        interval: float = 0.0,
+        log: logging.Logger = logger,
+    ):
+        self.level = level
+        self.every = max(1, every)
+        self.interval = interval
+        self.log = log
+        self.seen = 0
+        self.suppressed = 0
+        self._next_time = 0.0
+
+    def __call__(self, msg: str, *args):
+        self.seen += 1
+        if self.seen % self.every:
+            self.suppressed += 1
+            return
+        if self.interval:
+            now = time.monotonic()
+            if now < self._next_time:
+                self.suppressed += 1
+                return
+            self._next_time = now + self.interval
+        self.log.log(self.level, msg, *args)
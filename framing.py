@@ -0,0 +1,193 @@
+import struct
+from typing import List, Optional, Tuple
+
+# Binary frames as written by midi/main.cpp built with BINARY_OUTPUT:
+# sync byte, sequence number, note, velocity, checksum
+SYNC = 0xA5
+FRAME = struct.Struct("<BBBBB")
+
+TEXT = "text"
+BINARY = "binary"
+
+# Every run of consecutive sequence numbers of up to 256 is a slice of this
+_RAMP = bytes(range(256)) * 2
+
+
+def checksum(sequence: int, note: int, velocity: int) -> int:
+    """8-bit sum of the frame's payload bytes."""
+    return (sequence + note + velocity) & 0xFF
+
+
+def encode_frame(sequence: int, note: int, velocity: int) -> bytes:
+    """Build one frame, as the firmware does."""
+    sequence &= 0xFF
+    return FRAME.pack(SYNC, sequence, note, velocity, checksum(sequence, note, velocity))
+
+
+def detect_protocol(data) -> Optional[str]:
+    """Tell binary frames from text lines, or None until data says which.
+
+    Text from the board is ASCII and never holds the sync byte, so one
+    frame with a valid checksum means binary and a full line without a
+    sync byte means text.
+    """
+    start = data.find(SYNC)
+    while 0 <= start <= len(data) - FRAME.size:
+        _, sequence, note, velocity, check = FRAME.unpack_from(data, start)
+        if check == checksum(sequence, note, velocity):
+            return BINARY
+        start = data.find(SYNC, start + 1)
+    if start < 0 and 0x0A in data:
+        return TEXT
+    return None
+
+
+class SequenceCounter:
+    """Account for lost, duplicated and reordered samples by sequence number.
+
+    Sequence numbers are 8 bits and wrap, so a number up to 127 ahead of the
+    expected one is a gap and anything behind it arrived late. A late number
+    that was missed earlier counts as reordered, any other as a duplicate.
+    """
+
+    def __init__(self):
+        self.expected: Optional[int] = None
+        self.received = 0
+        self.lost = 0
+        self.gaps = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self._missing = bytearray(256)
+
+    def track(self, sequences: bytes):
+        """Count a run of received sequence numbers, in arrival order."""
+        count = len(sequences)
+        if not count:
+            return
+        self.received += count
+        first = sequences[0]
+        ramp = _RAMP[first : first + 256]
+        if first == self.expected and all(
+            sequences[i : i + 256] == ramp[: min(256, count - i)]
+            for i in range(0, count, 256)
+        ):
+            # Consecutive, the normal case, compared slice by slice
+            self.expected = (first + count) & 0xFF
+            # These numbers are no longer missing from an earlier wrap
+            end = first + min(count, 256)
+            self._missing[first : min(end, 256)] = bytes(min(end, 256) - first)
+            if end > 256:
+                self._missing[: end - 256] = bytes(end - 256)
+            return
+        for sequence in sequences:
+            self._track(sequence)
+
+    def _track(self, sequence: int):
+        missing = self._missing
+        expected = self.expected
+        if expected is None:
+            expected = sequence
+        ahead = (sequence - expected) & 0xFF
+        if ahead < 128:
+            if ahead:
+                self.gaps += 1
+                self.lost += ahead
+                for skipped in range(expected, expected + ahead):
+                    missing[skipped & 0xFF] = 1
+            missing[sequence] = 0
+            self.expected = (sequence + 1) & 0xFF
+        elif missing[sequence]:
+            missing[sequence] = 0
+            self.lost -= 1
+            self.reordered += 1
+        else:
+            self.duplicates += 1
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "lost": self.lost,
+            "gaps": self.gaps,
+            "duplicates": self.duplicates,
+            "reordered": self.reordered,
+        }
+
+
+class FrameDecoder:
+    """Split a binary stream into (note, velocity) samples.
+
+    Partial frames are kept until the rest arrives. Bytes that do not start
+    a frame with a valid checksum are skipped one at a time until the
+    stream lines up with a frame again, and counted in skipped. Sequence
+    numbers of decoded frames are accounted for in sequences.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.frames = 0
+        self.skipped = 0
+        self.sequences = SequenceCounter()
+
+    def reset(self):
+        """Forget a partial frame and the expected sequence number, e.g. after a reconnect."""
+        self._buffer.clear()
+        self.sequences.expected = None
+
+    def decode(self, chunk) -> Tuple[List[Tuple[int, int]], List[ValueError]]:
+        """Decode the complete frames received so far.
+
+        Returns the samples in order and an error for every run of bytes
+        that had to be skipped.
+        """
+        buffer = self._buffer
+        buffer += chunk
+        count = len(buffer) // FRAME.size
+        size = count * FRAME.size
+        if buffer[0:size : FRAME.size] == bytes((SYNC,)) * count:
+            # Aligned frames, the steady state: unpack them straight from the buffer
+            with memoryview(buffer) as view:
+                samples = [
+                    (note, velocity)
+                    for _, sequence, note, velocity, check in FRAME.iter_unpack(view[:size])
+                    if check == (sequence + note + velocity) & 0xFF
+                ]
+            if len(samples) == count:
+                self.frames += count
+                self.sequences.track(buffer[1:size : FRAME.size])
+                del buffer[:size]
+                return samples, []
+        return self._resync()
+
+    def _resync(self) -> Tuple[List[Tuple[int, int]], List[ValueError]]:
+        """Decode byte by byte, skipping anything that is not a valid frame."""
+        buffer = self._buffer
+        samples = []
+        sequences = bytearray()
+        errors = []
+        position = 0
+        skipped = 0
+        end = len(buffer) - FRAME.size
+        while position <= end:
+            _, sequence, note, velocity, check = FRAME.unpack_from(buffer, position)
+            if buffer[position] == SYNC and check == checksum(sequence, note, velocity):
+                if skipped:
+                    errors.append(ValueError(f"skipped {skipped} bytes between frames"))
+                    self.skipped += skipped
+                    skipped = 0
+                samples.append((note, velocity))
+                sequences.append(sequence)
+                position += FRAME.size
+            else:
+                skipped += 1
+                position += 1
+        # Keep a trailing partial frame, unless it cannot be the start of one
+        while position < len(buffer) and buffer[position] != SYNC:
+            skipped += 1
+            position += 1
+        if skipped:
+            errors.append(ValueError(f"skipped {skipped} bytes between frames"))
+            self.skipped += skipped
+        self.frames += len(samples)
+        self.sequences.track(sequences)
+        del buffer[:position]
+        return samples, errors
@@ -0,0 +1,122 @@
+from array import array
+from time import perf_counter_ns
+
+# Log-linear buckets: exact below 2 * SUB_BUCKETS ns, then SUB_BUCKETS
+# buckets per power of two, which keeps every bucket within ~6% of its value
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_TRACKABLE_NS = (1 << 40) - 1  # about 18 minutes
+
+
+def bucket_index(value: int) -> int:
+    """Bucket holding a non-negative value."""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucket_value(index: int) -> int:
+    """Lowest value that lands in a bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (index - shift * SUB_BUCKETS) << shift
+
+
+class LatencyHistogram:
+    """Fixed-memory HDR-style histogram of nanosecond latencies."""
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * (bucket_index(MAX_TRACKABLE_NS) + 1)))
+        self.count = 0
+        self.max = 0
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        elif value > MAX_TRACKABLE_NS:
+            value = MAX_TRACKABLE_NS
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """Value at the given percentile, rounded up to its bucket's top."""
+        if not self.count:
+            return 0
+        target = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_value(index + 1) - 1, self.max)
+        return self.max
+
+    def reset(self):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.count = 0
+        self.max = 0
+
+    def summary(self) -> dict:
+        """Count plus p50/p99/max in microseconds."""
+        return {
+            "count": self.count,
+            "p50_us": self.percentile(50) / 1000,
+            "p99_us": self.percentile(99) / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class LatencyTracker:
+    """Timestamps samples at read, parse and MIDI send time.
+
+    read_ns and parse_ns are the reader's latest stamps. sent_read_ns and
+    sent_parse_ns belong to the sample being sent, and every MIDI send
+    records the time since each of them. When samples are sent on another
+    thread (deferred), the sender sets those from stamps carried with the
+    sample instead of taking the reader's.
+    """
+
+    def __init__(self):
+        self.read_to_parse = LatencyHistogram()
+        self.parse_to_send = LatencyHistogram()
+        self.read_to_send = LatencyHistogram()
+        self.read_ns = 0
+        self.parse_ns = 0
+        self.sent_read_ns = 0
+        self.sent_parse_ns = 0
+        self.deferred = False
+
+    def mark_read(self):
+        self.read_ns = perf_counter_ns()
+
+    def mark_parsed(self):
+        self.parse_ns = now = perf_counter_ns()
+        self.read_to_parse.record(now - self.read_ns)
+        if not self.deferred:
+            self.sent_read_ns = self.read_ns
+            self.sent_parse_ns = now
+
+    def mark_sent(self):
+        now = perf_counter_ns()
+        self.parse_to_send.record(now - self.sent_parse_ns)
+        self.read_to_send.record(now - self.sent_read_ns)
+
+    def summary(self) -> dict:
+        return {
+            "read_to_parse": self.read_to_parse.summary(),
+            "parse_to_send": self.parse_to_send.summary(),
+            "read_to_send": self.read_to_send.summary(),
+        }
+
+    def report(self) -> str:
+        lines = ["Latency (us)         count       p50       p99       max"]
+        for stage, summary in self.summary().items():
+            lines.append(
+                f"  {stage:<15} {summary['count']:>8} {summary['p50_us']:>9.1f}"
+                f" {summary['p99_us']:>9.1f} {summary['max_us']:>9.1f}"
+            )
+        return "\n".join(lines)
@@ -6,6 +6,25 @@
 #define MIDI_NOTE 60   // Middle C (C4)
 #define MIDI_CHANNEL 0 // Channel 1 in MIDI
 
+// 1 prints raw accelerometer counts ("R x y z") and leaves roll/pitch and
+// the note mapping to the host (accel.py), 0 prints "note volume" floats
+#ifndef RAW_OUTPUT
+#define RAW_OUTPUT 0
+#endif
+
+// 1 writes 5 byte binary frames (sync, sequence, note, volume, checksum) to
+// the UART instead of printing text, see framing.py. The console wraps every
+// print in colour codes, so binary data cannot go through printInt.
+// The frames leave on the board's hardware UART pins, not the USB console:
+// the host has to read the port of a USB-UART adapter wired to them, with
+// SerialConfig.baudrate matching the board's UART setting. fwwasm.h has no
+// call to set the UART baud rate, so set it on the board itself; 9600 baud
+// carries the 5 byte frames at up to about 190 samples per second.
+#ifndef BINARY_OUTPUT
+#define BINARY_OUTPUT 0
+#endif
+#define FRAME_SYNC 0xA5
+
 int8_t exitApp = 0;
 
 void processAccelData(uint8_t *event_data) {
@@ -108,8 +127,20 @@ void processAccelData(uint8_t *event_data) {
     }
 
     setBoardLED(ind, 0x30, 0x30, 0x30, 100, LEDManagerLEDMode::ledpulsefade); 
+#if BINARY_OUTPUT
+    static uint8_t sequence = 0;
+    uint8_t frame[5] = {FRAME_SYNC, sequence++, static_cast<uint8_t>(midi_note),
+                        static_cast<uint8_t>(midi_volume), 0};
+    frame[4] = static_cast<uint8_t>(frame[1] + frame[2] + frame[3]);
+    UARTDataWrite(frame, sizeof(frame));
+#elif RAW_OUTPUT
+    printInt("R %d ", printOutColor::printColorBlack, printOutDataType::printInt16, iX);
+    printInt("%d ", printOutColor::printColorBlack, printOutDataType::printInt16, iY);
+    printInt("%d\n", printOutColor::printColorBlack, printOutDataType::printInt16, iZ);
+#else
     printFloat("%.1f ", printOutColor::printColorBlack, static_cast<float>(midi_note));
     printFloat("%.1f\n", printOutColor::printColorBlack, static_cast<float>(midi_volume));
+#endif
 
 }
 
@@ -0,0 +1,219 @@
+import socket
+import struct
+from typing import Optional, Tuple, Union
+
+
+class MidiBackend:
+    """Where MidiController sends its MIDI messages.
+
+    Backends build their own message objects so each one can use whatever
+    representation is cheapest to send. The default is 3 raw MIDI bytes.
+    Channels are 1-based, as in rtmidi's MidiMessage.
+    """
+
+    name = "base"
+
+    def note_on(self, channel: int, note: int, velocity: int):
+        """Build a note-on message."""
+        return bytes((0x90 | (channel - 1) & 0x0F, note & 0x7F, velocity & 0x7F))
+
+    def note_off(self, channel: int, note: int):
+        """Build a note-off message."""
+        return bytes((0x80 | (channel - 1) & 0x0F, note & 0x7F, 0))
+
+    def send(self, message):
+        """Send one message built by note_on or note_off."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the output."""
+
+
+class RtMidiBackend(MidiBackend):
+    """rtmidi output, preferring a loopMIDI port and falling back to a virtual one.
+
+    index picks which of the loopMIDI ports to open, so several outputs in
+    one process each get a port of their own; without that many ports, a
+    virtual port named virtual_port_name is created instead.
+    """
+
+    name = "rtmidi"
+
+    def __init__(self, virtual_port_name: str = "FreeWilly MIDI", index: int = 0):
+        import rtmidi
+        from rtmidi import MidiMessage
+
+        self._message = MidiMessage
+        self.midi_out = rtmidi.RtMidiOut()
+
+        # Find and connect to loopMIDI port
+        port_number = self.find_loopmidi_port(index)
+        if port_number is not None:
+            self.midi_out.openPort(port_number)
+            print(f"Connected to loopMIDI port: {self.midi_out.getPortName(port_number)}")
+        else:
+            print("No loopMIDI port found! Creating one...")
+            self.midi_out.openVirtualPort(virtual_port_name)
+            print(f"Created virtual MIDI port: {virtual_port_name}")
+
+    def find_loopmidi_port(self, index: int = 0) -> Optional[int]:
+        """Find the loopMIDI port at index among those available, the first by default."""
+        ports = self.midi_out.getPortCount()
+        print("\nAvailable MIDI ports:")
+        found = []
+        for i in range(ports):
+            port_name = self.midi_out.getPortName(i)
+            print(f"  {i}: {port_name}")
+            # Look for typical loopMIDI port names
+            if "loop" in port_name.lower() or "virtual" in port_name.lower():
+                found.append(i)
+        return found[index] if index < len(found) else None
+
+    def note_on(self, channel: int, note: int, velocity: int):
+        return self._message.noteOn(channel, note, velocity)
+
+    def note_off(self, channel: int, note: int):
+        return self._message.noteOff(channel, note)
+
+    def send(self, message):
+        self.midi_out.sendMessage(message)
+
+    def close(self):
+        self.midi_out.closePort()
+
+
+class NullBackend(MidiBackend):
+    """Discard every message, for measuring the pipeline without a MIDI driver."""
+
+    name = "null"
+
+    def send(self, message):
+        pass
+
+
+class RecordingBackend(MidiBackend):
+    """Keep every message in memory, for tests and offline checks."""
+
+    name = "recording"
+
+    def __init__(self):
+        self.messages = []
+        self.closed = False
+
+    def send(self, message):
+        self.messages.append(message)
+
+    def close(self):
+        self.closed = True
+
+
+class SocketBackend(MidiBackend):
+    """Send each message as one datagram to a UDP address or a Unix socket path.
+
+    Sends never block: messages the receiver cannot take right now, or that
+    have no receiver at all, are counted in dropped.
+    """
+
+    name = "socket"
+
+    def __init__(self, address: Union[str, Tuple[str, int]]):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.address = address
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.dropped = 0
+        try:
+            self.sock.connect(address)
+        except OSError:
+            # Unix receivers may not be listening yet, retry on every send
+            self._connected = False
+        else:
+            self._connected = True
+
+    def send(self, message):
+        try:
+            if self._connected:
+                self.sock.send(message)
+            else:
+                self.sock.sendto(message, self.address)
+        except OSError:
+            self.dropped += 1
+
+    def close(self):
+        self.sock.close()
+
+
+class MidiFileBackend(MidiBackend):
+    """Write messages to a type 0 Standard MIDI File as they are sent.
+
+    Nothing is sent in real time, so the caller sets time_ns to the moment
+    each message belongs to, e.g. the capture timestamp of its sample.
+    Events are streamed to disk, with one tick per millisecond, and the
+    track length is patched in when the backend is closed.
+    """
+
+    name = "midifile"
+
+    TICKS_PER_QUARTER = 1000
+    TEMPO_US = 1000000  # one quarter note per second, so a tick is 1 ms
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, self.TICKS_PER_QUARTER))
+        self.file.write(b"MTrk\0\0\0\0")
+        self._track_start = self.file.tell()
+        self.time_ns = 0
+        self.events = 0
+        self._start_ns: Optional[int] = None
+        self._tick = 0
+        self._write(0, b"\xff\x51\x03" + self.TEMPO_US.to_bytes(3, "big"))
+
+    def _write(self, tick: int, event: bytes):
+        delta = max(0, tick - self._tick)
+        self._tick += delta
+        # Variable-length quantity, 7 bits per byte, most significant first
+        vlq = bytearray((delta & 0x7F,))
+        delta >>= 7
+        while delta:
+            vlq.insert(0, 0x80 | delta & 0x7F)
+            delta >>= 7
+        self.file.write(vlq + event)
+
+    def send(self, message):
+        if self._start_ns is None:
+            self._start_ns = self.time_ns
+        self._write((self.time_ns - self._start_ns) // 1000000, message)
+        self.events += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._write(self._tick, b"\xff\x2f\x00")
+        length = self.file.tell() - self._track_start
+        self.file.seek(self._track_start - 4)
+        self.file.write(struct.pack(">I", length))
+        self.file.close()
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (
+        RtMidiBackend,
+        NullBackend,
+        RecordingBackend,
+        SocketBackend,
+        MidiFileBackend,
+    )
+}
+
+
+def create_backend(name: str, *args, **kwargs) -> MidiBackend:
+    """Create a backend by name: rtmidi, null, recording, socket or midifile."""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown MIDI backend '{name}', expected one of {', '.join(BACKENDS)}"
+        ) from None
+    return backend(*args, **kwargs)
@@ -1,10 +1,95 @@
+import logging
 import math
 import time
 from typing import Optional, Tuple
 import serial
-import rtmidi
-from rtmidi import MidiMessage
-import re
+from accel import NoteQuantizer
+from capture import CaptureReader, CaptureWriter, paced
+from debug_log import RateLimitedLog, logger
+from framing import BINARY, TEXT, FrameDecoder, detect_protocol
+from latency import LatencyTracker
+from midi_backends import MidiBackend, RtMidiBackend, create_backend
+from pipeline import DROP_OLDEST, SamplePipeline
+from serial_config import SerialConfig
+from serial_parser import LineParser, strip_ansi
+from smoothing import SampleSmoother
+
+
+def coalesce_samples(samples: list, keep_note_changes: bool = False) -> list:
+    """Reduce a batch of (note, velocity) samples to the newest state.
+
+    With keep_note_changes, the newest sample of every run of equal notes is
+    kept so that note boundary crossings inside the batch are still played.
+    """
+    if not keep_note_changes:
+        return samples[-1:]
+    kept = []
+    for sample in samples:
+        if kept and kept[-1][0] == sample[0]:
+            kept[-1] = sample
+        else:
+            kept.append(sample)
+    return kept
+
+
+def find_serial_port(
+    vid: int, pid: int, serial_number: Optional[str] = None
+) -> Optional[str]:
+    """Device path of the first connected USB serial port with this VID/PID."""
+    from serial.tools import list_ports
+
+    for port in list_ports.comports():
+        if port.vid == vid and port.pid == pid:
+            if serial_number is None or port.serial_number == serial_number:
+                return port.device
+    return None
+
+
+class MidiMessageCache:
+    """Memoized note-on/note-off messages so steady-state sends build nothing.
+
+    Messages are built by the backend on first use and kept in per
+    channel/note rows indexed by plain ints. Once max_size messages are
+    cached, new ones are built on the fly instead so memory stays bounded.
+    """
+
+    def __init__(self, backend: MidiBackend, max_size: int = 4096):
+        self.backend = backend
+        self.max_size = max_size
+        self.size = 0
+        self._note_on = [None] * (16 * 128)  # rows of 128 velocities
+        self._note_off = [None] * (16 * 128)
+
+    def note_on(self, channel: int, note: int, velocity: int):
+        """Note-on for a 1-based channel."""
+        if not (1 <= channel <= 16 and 0 <= note < 128 and 0 <= velocity < 128):
+            return self.backend.note_on(channel, note, velocity)
+        key = (channel - 1) << 7 | note
+        row = self._note_on[key]
+        if row is None:
+            if self.size >= self.max_size:
+                return self.backend.note_on(channel, note, velocity)
+            row = self._note_on[key] = [None] * 128
+        message = row[velocity]
+        if message is None:
+            message = self.backend.note_on(channel, note, velocity)
+            if self.size < self.max_size:
+                row[velocity] = message
+                self.size += 1
+        return message
+
+    def note_off(self, channel: int, note: int):
+        """Note-off for a 1-based channel."""
+        if not (1 <= channel <= 16 and 0 <= note < 128):
+            return self.backend.note_off(channel, note)
+        key = (channel - 1) << 7 | note
+        message = self._note_off[key]
+        if message is None:
+            message = self.backend.note_off(channel, note)
+            if self.size < self.max_size:
+                self._note_off[key] = message
+                self.size += 1
+        return message
 
 
 class MidiController:
@@ -14,7 +99,18 @@ class MidiController:
     PENTATONIC_SCALE = [0, 2, 4, 7, 9, 12, 14, 16]
     BLUES_SCALE = [0, 3, 5, 6, 7, 10, 12, 15]
 
-    def __init__(self, serial_port: str, midi_channel: int = 0):
+    # Reconnect backoff in seconds, doubling from the first to the longest wait
+    RECONNECT_DELAY = 0.01
+    MAX_RECONNECT_DELAY = 0.5
+
+    def __init__(
+        self,
+        serial_port: str,
+        midi_channel: int = 0,
+        backend: Optional[MidiBackend] = None,
+        protocol: Optional[str] = None,
+        config: Optional[SerialConfig] = None,
+    ):
         self.current_octave = 4  # Start at middle octave
         self.base_octave = 4     # Reference octave for calculations
         self.current_scale = self.MAJOR_SCALE
@@ -23,36 +119,86 @@ class MidiController:
         self.powered = True
         self.show_guide = False
 
-        # MIDI setup with loopMIDI support
+        # MIDI setup, rtmidi with loopMIDI support unless told otherwise
         self.midi_channel = midi_channel
-        self.midi_out = rtmidi.RtMidiOut()
-
-        # Find and connect to loopMIDI port
-        port_number = self.find_loopmidi_port()
-        if port_number is not None:
-            self.midi_out.openPort(port_number)
-            print(f"Connected to loopMIDI port: {self.midi_out.getPortName(port_number)}")
-        else:
-            print("No loopMIDI port found! Creating one...")
-            self.midi_out.openVirtualPort("FreeWilly MIDI")
-            print("Created virtual MIDI port: FreeWilly MIDI")
+        self.midi_out = backend if backend is not None else RtMidiBackend()
+        self.messages = MidiMessageCache(self.midi_out)
 
         # Serial setup
         self.serial_port = serial_port
+        self.serial_config = config if config is not None else SerialConfig()
+        # USB (vid, pid) to find the board by after it reconnects, if known
+        self.usb_id: Optional[Tuple[int, int]] = None
+        self.reconnects = 0
         self.current_midi_value = 60  # Middle C
         self.current_velocity = 64  # Middle velocity
+        self._rx_buffer = bytearray()  # Reused across batch reads
+        self.parser = LineParser()
+
+        # "text" lines or "binary" frames, detected from the data unless given
+        self.protocol = protocol
+        self.frames = FrameDecoder()
 
-    def find_loopmidi_port(self) -> Optional[int]:
-        """Find the first available loopMIDI port."""
-        ports = self.midi_out.getPortCount()
-        print("\nAvailable MIDI ports:")
-        for i in range(ports):
-            port_name = self.midi_out.getPortName(i)
-            print(f"  {i}: {port_name}")
-            # Look for typical loopMIDI port names
-            if "loop" in port_name.lower() or "virtual" in port_name.lower():
-                return i
-        return None
+        # Per-sample debug output is off by default, it costs more than the send
+        self.debug = False
+        self.sample_log = RateLimitedLog(logging.DEBUG)
+        self.error_log = RateLimitedLog(logging.WARNING, interval=1.0)
+
+        # Read -> parse -> send latency, off unless track_latency() is called
+        self.latency: Optional[LatencyTracker] = None
+
+        # Raw serial capture, off unless start_capture() is called
+        self.capture: Optional[CaptureWriter] = None
+
+        # One Euro smoothing of notes and velocities, off unless smooth() is called
+        self.smoother: Optional[SampleSmoother] = None
+        # Hysteresis and dwell time for note changes, off unless quantize() is called
+        self.quantizer: Optional[NoteQuantizer] = None
+
+    def set_debug(self, enabled: bool = True, every: int = 1, interval: float = 0.0):
+        """Log every Nth sample, at most once per interval seconds, at DEBUG level."""
+        self.sample_log = RateLimitedLog(logging.DEBUG, every, interval)
+        if enabled and not logger.isEnabledFor(logging.DEBUG):
+            logger.setLevel(logging.DEBUG)
+        self.debug = enabled
+
+    def track_latency(self) -> LatencyTracker:
+        """Start timestamping samples; the histograms are reported on shutdown."""
+        self.latency = LatencyTracker()
+        return self.latency
+
+    def start_capture(self, path: str) -> CaptureWriter:
+        """Tee every raw serial chunk with a timestamp into a capture file."""
+        self.capture = CaptureWriter(path)
+        return self.capture
+
+    def smooth(self, rate: float = 100.0, **kwargs) -> SampleSmoother:
+        """Smooth samples before they reach send_midi_messages; see SampleSmoother.
+
+        Smoothed notes snap to the notes of parser.mapper unless a scale is given.
+        """
+        kwargs.setdefault("scale", self.parser.mapper.notes)
+        self.smoother = SampleSmoother(rate, **kwargs)
+        return self.smoother
+
+    def quantize(
+        self, hysteresis: float = 0.25, min_dwell: float = 0.03, rate: float = 100.0
+    ) -> NoteQuantizer:
+        """Let a NoteQuantizer over parser.mapper's notes decide note changes.
+
+        With smooth() on as well, the quantizer sees the smoothed note
+        before it is snapped, so the hysteresis band acts too. Boards
+        sending raw counts can quantize roll in degrees instead, with a
+        quantizer on parser.mapper.
+        """
+        self.quantizer = NoteQuantizer.for_notes(
+            self.parser.mapper.notes, hysteresis, min_dwell, rate
+        )
+        return self.quantizer
+
+    def power_off(self):
+        """Stop processing; the read loops exit on their next pass."""
+        self.powered = False
 
     def send_midi_messages(self):
         """Send MIDI messages based on current MIDI value and velocity."""
@@ -63,16 +209,18 @@ class MidiController:
         if self.last_note != self.current_midi_value:
             if self.last_note is not None:
                 # Send note off for previous note
-                note_off_msg = MidiMessage.noteOff(
+                note_off_msg = self.messages.note_off(
                     self.midi_channel + 1, self.last_note
                 )
-                self.midi_out.sendMessage(note_off_msg)
+                self.midi_out.send(note_off_msg)
 
             # Send note on for new note
-            note_on_msg = MidiMessage.noteOn(
+            note_on_msg = self.messages.note_on(
                 self.midi_channel + 1, self.current_midi_value, self.current_velocity
             )
-            self.midi_out.sendMessage(note_on_msg)
+            self.midi_out.send(note_on_msg)
+            if self.latency is not None:
+                self.latency.mark_sent()
             self.last_note = self.current_midi_value
             self.last_velocity = self.current_velocity
         elif (
@@ -80,89 +228,379 @@ class MidiController:
             and abs(self.last_velocity - self.current_velocity) >= 31
         ):
             # Send note off for previous note
-            note_off_msg = MidiMessage.noteOff(self.midi_channel + 1, self.last_note)
-            self.midi_out.sendMessage(note_off_msg)
+            note_off_msg = self.messages.note_off(self.midi_channel + 1, self.last_note)
+            self.midi_out.send(note_off_msg)
             # Update velocity if note hasn't changed
-            note_on_msg = MidiMessage.noteOn(
+            note_on_msg = self.messages.note_on(
                 self.midi_channel + 1, self.current_midi_value, self.current_velocity
             )
-            self.midi_out.sendMessage(note_on_msg)
+            self.midi_out.send(note_on_msg)
+            if self.latency is not None:
+                self.latency.mark_sent()
             self.last_velocity = self.current_velocity
 
     def strip_ansi_codes(self, text: str) -> str:
         """Remove ANSI escape codes from text."""
-        ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-        return ansi_escape.sub("", text)
+        return strip_ansi(text)
 
-    def process_serial_data(self, baudrate: int = 9600, timeout: int = 1):
+    def parse_line(self, line: bytes) -> Optional[Tuple[int, int]]:
+        """Parse one raw serial line into a (note, velocity) pair."""
         try:
-            with serial.Serial(self.serial_port, baudrate, timeout=timeout) as ser:
-                print(f"Connected to serial port: {self.serial_port}")
-
-                while self.powered:
-                    try:
-                        raw_data = ser.readline().decode("utf-8").strip()
-                        if raw_data:
-                            try:
-                                # Remove any prefixes and ANSI codes
-                                data = raw_data.replace("0134", "").replace("134", "")
-                                data = self.strip_ansi_codes(data)
-
-                                # Split the string on whitespace
-                                parts = data.split()
-                                if len(parts) >= 2:
-                                    midi_value = int(float(parts[0]))  # MIDI note value
-                                    velocity = int(float(parts[1]))  # MIDI velocity
-
-                                    # Ensure values are within MIDI ranges
-                                    self.current_midi_value = midi_value
-                                    self.current_velocity = velocity
-
-                                    self.send_midi_messages()
-
-                                    # Debug output
-                                    print(
-                                        f"MIDI Note: {self.current_midi_value}, Velocity: {self.current_velocity}"
-                                    )
-                                else:
-                                    print(
-                                        f"Invalid data format (not enough values): {raw_data}"
-                                    )
-
-                            except ValueError as e:
-                                print(
-                                    f"Could not parse values from '{raw_data}' -> '{data}': {e}"
-                                )
-                                continue
-
-                    except ValueError as e:
-                        print(f"Invalid data format: {e}")
-                        continue
+            sample = self.parser.parse(line)
+        except ValueError as e:
+            self.error_log("Invalid data format: %s", e)
+            return None
+        if sample is not None and self.latency is not None:
+            self.latency.mark_parsed()
+        return sample
+
+    def apply_sample(self, midi_value: int, velocity: int):
+        """Make a parsed sample the current state and send MIDI for it."""
+        if self.smoother is not None:
+            midi_value, velocity = self.smoother(midi_value, velocity)
+            if self.quantizer is not None:
+                midi_value = self.quantizer(self.smoother.note_value)
+        elif self.quantizer is not None:
+            midi_value = self.quantizer(midi_value)
+        # Ensure values are within MIDI ranges
+        self.current_midi_value = midi_value
+        self.current_velocity = velocity
+
+        self.send_midi_messages()
+
+        # Debug output, a single check when disabled
+        if self.debug:
+            self.sample_log("MIDI Note: %d, Velocity: %d", midi_value, velocity)
+
+    def handle_line(self, line: bytes):
+        """Parse one raw serial line and forward it to MIDI."""
+        if self.protocol != TEXT:
+            # Binary frames are not lines, and the first data decides which
+            self.handle_batch(self.feed(line))
+            return
+        sample = self.parse_line(line)
+        if sample is not None:
+            self.apply_sample(*sample)
+
+    def parse_batch(self, block: bytes) -> list:
+        """Parse a block of complete lines into (note, velocity) samples."""
+        if not block:
+            return []
+        if self.protocol == BINARY:
+            samples, errors = self.frames.decode(block)
+        else:
+            samples, errors = self.parser.parse_many(block)
+        if self.latency is not None:
+            self.latency.mark_parsed()
+        for e in errors:
+            self.error_log("Invalid data format: %s", e)
+        return samples
+
+    def send_samples(
+        self, samples: list, coalesce: bool = False, keep_note_changes: bool = False
+    ):
+        """Forward parsed samples to MIDI, optionally coalesced first."""
+        if coalesce:
+            samples = coalesce_samples(samples, keep_note_changes)
+        latency = self.latency
+        if latency is None:
+            for midi_value, velocity in samples:
+                self.apply_sample(midi_value, velocity)
+            return
+        for sample in samples:
+            if len(sample) == 4:
+                # Stamped by a reader on another thread, see SamplePipeline
+                latency.sent_read_ns, latency.sent_parse_ns = sample[2], sample[3]
+            self.apply_sample(sample[0], sample[1])
+
+    def handle_batch(
+        self, block: bytes, coalesce: bool = False, keep_note_changes: bool = False
+    ):
+        """Parse a block of complete lines and forward the samples to MIDI."""
+        self.send_samples(self.parse_batch(block), coalesce, keep_note_changes)
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Buffer raw serial bytes and return the complete lines received so far.
+
+        Binary frames are passed straight through to the frame decoder.
+        """
+        buffer = self._rx_buffer
+        if self.protocol is None:
+            self.protocol = detect_protocol(bytes(buffer) + chunk)
+        if self.protocol == BINARY:
+            if buffer:
+                chunk = bytes(buffer) + chunk
+                buffer.clear()
+            return bytes(chunk)
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            return b""
+        block = bytes(buffer[:end])
+        del buffer[: end + 1]
+        return block
+
+    def read_batch(self, ser: serial.Serial) -> bytes:
+        """Drain everything waiting on the serial port in a single read."""
+        try:
+            # Block (up to the port timeout) for the first byte only when idle
+            chunk = ser.read(ser.in_waiting or self.serial_config.read_size)
+        except serial.SerialException:
+            raise
+        except OSError as e:
+            # in_waiting fails with a plain OSError when the board hangs up
+            raise serial.SerialException(f"read failed: {e}") from e
+        if self.latency is not None:
+            self.latency.mark_read()
+        if self.capture is not None and chunk:
+            self.capture.write(chunk)
+        return self.feed(chunk)
+
+    def process_serial_data(
+        self,
+        baudrate: Optional[int] = None,
+        timeout: Optional[float] = None,
+        batch: bool = False,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+        threaded: bool = False,
+        ring_capacity: int = 1024,
+        backpressure: str = DROP_OLDEST,
+        reconnect: bool = False,
+    ):
+        """Read the board and send MIDI until powered off or interrupted.
+
+        A serial error ends the session, unless reconnect is set: then the
+        sounding note is released and the port is reopened as soon as the
+        board is back, with the controller's state otherwise kept.
+        """
+        # Coalescing works on whole batches, so it implies the batch reader
+        batch = batch or coalesce
+        self.pipeline = None
+        start = time.monotonic()
+        delay = self.RECONNECT_DELAY
+        lost_at = None
+        try:
+            while True:
+                try:
+                    with self.serial_config.open(self.serial_port, baudrate, timeout) as ser:
+                        if lost_at is None:
+                            print(f"Connected to serial port: {self.serial_port}")
+                        else:
+                            self.reconnects += 1
+                            print(
+                                f"Reconnected to {self.serial_port} after"
+                                f" {(time.monotonic() - lost_at) * 1000:.0f} ms"
+                            )
+                            lost_at = None
+                            delay = self.RECONNECT_DELAY
+                        self.read_loop(
+                            ser,
+                            batch,
+                            coalesce,
+                            keep_note_changes,
+                            threaded,
+                            ring_capacity,
+                            backpressure,
+                        )
+                    break
+                except serial.SerialException as e:
+                    if not (reconnect and self.powered):
+                        print(f"Serial port error: {e}")
+                        break
+                    if lost_at is None:
+                        print(f"Serial port error: {e}, reconnecting")
+                        lost_at = time.monotonic()
+                        self.silence()
+                        self.reset_link()
+                    delay = self.wait_for_device(delay)
+                    if not self.powered:
+                        break
 
         except KeyboardInterrupt:
             self.power_off()
-        except serial.SerialException as e:
-            print(f"Serial port error: {e}")
         finally:
-            if self.last_note is not None:
-                self.midi_out.sendMessage(
-                    [int(0x80 | self.midi_channel), int(self.last_note), 0]
+            if self.pipeline is not None:
+                print(f"Pipeline stats: {self.pipeline.stats()}")
+            if self.protocol == BINARY:
+                print(f"Link stats: {self.link_stats(time.monotonic() - start)}")
+            if self.latency is not None:
+                print(self.latency.report())
+            self.close()
+
+    def read_loop(
+        self,
+        ser: serial.Serial,
+        batch: bool = False,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+        threaded: bool = False,
+        ring_capacity: int = 1024,
+        backpressure: str = DROP_OLDEST,
+    ):
+        """Read, parse and send from an open port until powered off or it fails."""
+        if threaded:
+            # Reader and MIDI writer threads joined by a ring buffer
+            self.pipeline = SamplePipeline(
+                self, ring_capacity, backpressure, coalesce, keep_note_changes
+            )
+            self.pipeline.run(ser)
+
+        while self.powered:
+            if batch or self.protocol != TEXT:
+                # Drain bursts from the board instead of one line per pass.
+                # Binary frames have no line ends, and until the first data
+                # shows which protocol the board speaks neither is known.
+                self.handle_batch(self.read_batch(ser), coalesce, keep_note_changes)
+            else:
+                line = ser.readline()
+                if self.latency is not None:
+                    self.latency.mark_read()
+                if self.capture is not None and line:
+                    self.capture.write(line)
+                if self._rx_buffer:
+                    # The start of a line read while detecting the protocol
+                    line = bytes(self._rx_buffer) + line
+                    self._rx_buffer.clear()
+                self.handle_line(line)
+
+    def wait_for_device(self, delay: float) -> float:
+        """Sleep before the next reconnect attempt and return the following delay.
+
+        With usb_id set, the board is looked up by VID/PID, as it may come
+        back under another port name.
+        """
+        time.sleep(delay)
+        if self.usb_id is not None:
+            port = find_serial_port(*self.usb_id)
+            if port is not None:
+                self.serial_port = port
+        return min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def silence(self):
+        """Release the sounding note, e.g. when the board disappears mid-note."""
+        if self.last_note is not None:
+            self.midi_out.send(
+                self.messages.note_off(self.midi_channel + 1, self.last_note)
+            )
+        self.last_note = None
+        self.last_velocity = None
+
+    def reset_link(self):
+        """Drop partial lines and frames of a lost connection, keeping the stats."""
+        self._rx_buffer.clear()
+        self.frames.reset()
+        if self.smoother is not None:
+            self.smoother.reset()
+        for quantizer in (self.quantizer, self.parser.mapper.quantizer):
+            if quantizer is not None:
+                quantizer.reset()
+
+    def link_stats(self, seconds: float) -> dict:
+        """Sample rate and lost, duplicated or reordered frames on a binary link."""
+        stats = self.frames.sequences.stats()
+        stats["samples_per_s"] = stats["received"] / seconds if seconds > 0 else 0.0
+        stats["skipped_bytes"] = self.frames.skipped
+        return stats
+
+    def replay(
+        self,
+        path: str,
+        speed: float = 1.0,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+    ) -> dict:
+        """Feed a capture through the parse and send path as if read live.
+
+        Chunks are replayed with their recorded boundaries, so a session
+        produces the same MIDI every time. speed scales the recorded timing,
+        0 replays as fast as possible.
+        """
+        chunks = samples = 0
+        start = time.perf_counter()
+        try:
+            with CaptureReader(path) as reader:
+                for chunk in paced(reader, speed):
+                    if not self.powered:
+                        break
+                    if self.latency is not None:
+                        self.latency.mark_read()
+                    batch = self.parse_batch(self.feed(chunk))
+                    self.send_samples(batch, coalesce, keep_note_changes)
+                    chunks += 1
+                    samples += len(batch)
+                if reader.truncated:
+                    print(f"Capture {path} ends in a partial record")
+        except KeyboardInterrupt:
+            self.power_off()
+        finally:
+            if self.latency is not None:
+                print(self.latency.report())
+            self.close()
+        seconds = time.perf_counter() - start
+        return {
+            "chunks": chunks,
+            "samples": samples,
+            "seconds": seconds,
+            "samples_per_s": samples / seconds if seconds else 0.0,
+        }
+
+    def close(self):
+        """Silence the last note, close the MIDI output and any capture."""
+        self.silence()
+        self.midi_out.close()
+        if self.capture is not None:
+            self.capture.close()
+            print(f"Captured {self.capture.records} chunks to {self.capture.path}")
+        for quantizer in (self.quantizer, self.parser.mapper.quantizer):
+            if quantizer is not None:
+                print(
+                    f"Note quantizer kept {quantizer.changes} of"
+                    f" {quantizer.plain_changes} note changes,"
+                    f" suppressing {quantizer.suppressed} MIDI messages"
                 )
-            self.midi_out.closePort()
 
 
 def main():
     import sys
     import serial.tools.list_ports
 
-    SERIAL_PORT = "COM3"
+    # Pass a port such as the one simulator.py prints to override COM3
+    SERIAL_PORT = sys.argv[1] if len(sys.argv) > 1 else "COM3"
     print(f"\nUsing serial port: {SERIAL_PORT}")
 
     MIDI_CHANNEL = 0  # MIDI channel 1
+    MIDI_BACKEND = "rtmidi"  # "null" runs the pipeline without a MIDI driver
+    DEBUG_EVERY = 0  # log every Nth sample, 0 for no per-sample output
+    TRACK_LATENCY = False  # report read -> send latency on exit
+    CAPTURE_PATH = None  # e.g. "session.tmcap" to record the raw serial stream
+    # "text" or "binary", None detects it from the data. BINARY_OUTPUT frames
+    # come out of the board's UART, so for binary pass the UART adapter's port
+    # and give SERIAL_CONFIG the board's UART baud rate.
+    PROTOCOL = None
+    # Port settings, e.g. SerialConfig(921600, timeout=0.05, low_latency=True)
+    SERIAL_CONFIG = SerialConfig()
+    RECONNECT = True  # keep playing across USB disconnects
+    USB_ID = None  # (vid, pid) of the board, to find it again under a new port name
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
     try:
-        controller = MidiController(SERIAL_PORT, MIDI_CHANNEL)
-        controller.process_serial_data()
+        controller = MidiController(
+            SERIAL_PORT,
+            MIDI_CHANNEL,
+            create_backend(MIDI_BACKEND),
+            PROTOCOL,
+            SERIAL_CONFIG,
+        )
+        if DEBUG_EVERY:
+            controller.set_debug(every=DEBUG_EVERY)
+        if TRACK_LATENCY:
+            controller.track_latency()
+        if CAPTURE_PATH:
+            controller.start_capture(CAPTURE_PATH)
+        controller.usb_id = USB_ID
+        controller.process_serial_data(reconnect=RECONNECT)
     except KeyboardInterrupt:
         print("\nExiting...")
     except Exception as e:
@@ -0,0 +1,226 @@
+import selectors
+import time
+from typing import Dict, List, Optional
+
+import serial
+
+from framing import BINARY
+from midi_backends import MidiBackend, RtMidiBackend
+from midimaker import MidiController
+from serial_config import SerialConfig
+
+
+class DeviceHost:
+    """Drive many boards from a single thread with one selector.
+
+    Every board gets its own MidiController, and with it its own parser,
+    protocol detection and note state. Boards share one MIDI output on
+    consecutive channels unless given their own backend. An output has
+    16 channels, so from the 17th board on each needs a backend of its
+    own. Ports are read without blocking whenever the selector reports
+    them readable, so an idle board costs nothing and there is no thread
+    per device. This needs POSIX serial devices (Linux, macOS), as a
+    selector cannot wait on a Windows COM port.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[MidiBackend] = None,
+        config: Optional[SerialConfig] = None,
+    ):
+        self.backend = backend
+        self.config = config if config is not None else SerialConfig()
+        self.selector = selectors.DefaultSelector()
+        self.controllers: List[MidiController] = []
+        self.ports: Dict[MidiController, serial.Serial] = {}
+        self.stats: Dict[MidiController, dict] = {}
+        self.powered = True
+
+    def add(
+        self,
+        serial_port: str,
+        midi_channel: Optional[int] = None,
+        backend: Optional[MidiBackend] = None,
+        **kwargs,
+    ) -> MidiController:
+        """Open a board and start reading it; channels default to the next free one.
+
+        Two boards never share a channel on one output, as they would cut
+        off each other's notes.
+        """
+        if backend is None:
+            if self.backend is None:
+                self.backend = RtMidiBackend()
+            backend = self.backend
+        # Boards removed after a port error have given their channel back
+        used = {c.midi_channel for c in self.ports if c.midi_out is backend}
+        if midi_channel is None:
+            free = [channel for channel in range(16) if channel not in used]
+            if not free:
+                raise ValueError(
+                    f"All 16 MIDI channels of the output are taken, give {serial_port}"
+                    " a backend of its own"
+                )
+            midi_channel = free[0]
+        elif midi_channel in used:
+            raise ValueError(
+                f"MIDI channel {midi_channel + 1} of the output is already taken"
+            )
+        controller = MidiController(
+            serial_port, midi_channel, backend, config=self.config, **kwargs
+        )
+        ser = self.config.open(serial_port, timeout=0)
+        self.selector.register(ser.fileno(), selectors.EVENT_READ, controller)
+        self.controllers.append(controller)
+        self.ports[controller] = ser
+        self.stats[controller] = {"reads": 0, "samples": 0, "errors": 0}
+        print(f"Connected to serial port: {serial_port} (channel {midi_channel + 1})")
+        return controller
+
+    def remove(self, controller: MidiController):
+        """Stop reading a board and release its note, keeping its stats."""
+        ser = self.ports.pop(controller, None)
+        if ser is None:
+            return
+        self.selector.unregister(ser.fileno())
+        ser.close()
+        controller.silence()
+        controller.powered = False
+
+    def power_off(self):
+        self.powered = False
+
+    def run(
+        self,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+        timeout: float = 0.1,
+    ):
+        """Serve every board, then report and close everything."""
+        start = time.monotonic()
+        try:
+            self.serve(coalesce, keep_note_changes, timeout)
+        except KeyboardInterrupt:
+            self.power_off()
+        finally:
+            print(self.report(time.monotonic() - start))
+            self.close()
+
+    def serve(
+        self,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+        timeout: float = 0.1,
+    ):
+        """Read, parse and send for every board until powered off or all ports failed."""
+        while self.powered and self.ports:
+            for key, _ in self.selector.select(timeout):
+                controller = key.data
+                stats = self.stats[controller]
+                try:
+                    samples = controller.parse_batch(
+                        controller.read_batch(self.ports[controller])
+                    )
+                except serial.SerialException as e:
+                    print(f"Serial port error on {controller.serial_port}: {e}")
+                    stats["errors"] += 1
+                    self.remove(controller)
+                    continue
+                stats["reads"] += 1
+                if samples:
+                    stats["samples"] += len(samples)
+                    controller.send_samples(samples, coalesce, keep_note_changes)
+
+    def device_stats(self, seconds: float) -> List[dict]:
+        """Per-board counters, with link stats for boards sending binary frames."""
+        devices = []
+        for controller in self.controllers:
+            stats = dict(self.stats[controller])
+            stats["port"] = controller.serial_port
+            stats["channel"] = controller.midi_channel + 1
+            stats["protocol"] = controller.protocol
+            stats["samples_per_s"] = stats["samples"] / seconds if seconds > 0 else 0.0
+            if controller.protocol == BINARY:
+                stats["link"] = controller.link_stats(seconds)
+            devices.append(stats)
+        return devices
+
+    def report(self, seconds: float) -> str:
+        lines = [
+            f"{'port':<20} {'ch':>3} {'samples':>9} {'per s':>8} {'reads':>8} {'errors':>6}"
+        ]
+        for stats in self.device_stats(seconds):
+            lines.append(
+                f"{stats['port']:<20} {stats['channel']:>3} {stats['samples']:>9}"
+                f" {stats['samples_per_s']:>8.1f} {stats['reads']:>8} {stats['errors']:>6}"
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        """Release every board's note, then close ports and each MIDI output once."""
+        for controller in list(self.ports):
+            self.remove(controller)
+        backends = []
+        for controller in self.controllers:
+            if controller.capture is not None:
+                controller.capture.close()
+            if not any(controller.midi_out is backend for backend in backends):
+                backends.append(controller.midi_out)
+        for backend in backends:
+            backend.close()
+        self.selector.close()
+
+
+def main():
+    import argparse
+    import logging
+    import threading
+
+    from midi_backends import create_backend
+
+    parser = argparse.ArgumentParser(description="Play several FREE-WILi boards at once")
+    parser.add_argument("ports", nargs="*", help="serial ports, one MIDI channel each")
+    parser.add_argument("--backend", default="rtmidi", help="MIDI backend name")
+    parser.add_argument("--simulate", type=int, default=0, help="add N simulated boards")
+    parser.add_argument(
+        "--rate", type=float, default=100.0, help="simulated samples per second"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=0.0, help="seconds, 0 runs until Ctrl+C"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    host = DeviceHost(create_backend(args.backend))
+    boards = []
+    if args.simulate:
+        from simulator import PROFILES, SimulatedBoard
+
+        profiles = sorted(PROFILES)
+        for i in range(args.simulate):
+            board = SimulatedBoard(args.rate, profiles[i % len(profiles)], seed=i)
+            boards.append(board.start())
+    for i, port in enumerate(args.ports + [board.port for board in boards]):
+        if i and i % 16 == 0:
+            # Every output has 16 channels, open another one for the next boards
+            group = i // 16
+            if args.backend == "rtmidi":
+                # A port of its own, or the new boards would land on the first one
+                host.backend = create_backend(
+                    args.backend, f"FreeWilly MIDI {group + 1}", index=group
+                )
+            else:
+                host.backend = create_backend(args.backend)
+        host.add(port)
+    if args.duration:
+        threading.Timer(args.duration, host.power_off).start()
+    cpu = time.process_time()
+    host.run()
+    cpu = time.process_time() - cpu
+    for board in boards:
+        board.close()
+    print(f"CPU time {cpu:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
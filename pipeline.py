@@ -0,0 +1,235 @@
+import threading
+from typing import Optional
+
+# Backpressure policies for a full SampleRing
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class SampleRing:
+    """Fixed-size single-producer/single-consumer ring of parsed samples.
+
+    The slot list is allocated once. The producer only moves the head and
+    the consumer only moves the tail, and a slot assignment is atomic, so
+    moving samples takes no lock. Each side flags when it is about to sleep,
+    and the other sets the wakeup Event (which does lock) only then, so a
+    busy stream pays for no wakeups. Under drop-oldest the producer
+    overwrites the oldest slots and the consumer notices from the counters
+    and skips whatever was overwritten.
+    """
+
+    def __init__(self, capacity: int = 1024, policy: str = DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(
+                f"Unknown backpressure policy '{policy}', expected one of {', '.join(POLICIES)}"
+            )
+        self.capacity = capacity
+        self.policy = policy
+        self.closed = False
+        self._slots = [None] * capacity
+        self._head = 0  # total samples written, owned by the producer
+        self._tail = 0  # total samples consumed, owned by the consumer
+        self._readable = threading.Event()
+        self._writable = threading.Event()
+        # Set by a side before it sleeps, then it checks the counters again
+        self._reader_waiting = False
+        self._writer_waiting = False
+
+        # Metrics
+        self.dropped = 0  # refused by the producer (drop-newest)
+        self.overwritten = 0  # lost to the producer lapping the consumer (drop-oldest)
+        self.blocked = 0  # pushes that had to wait for room (block)
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return min(self._head - self._tail, self.capacity)
+
+    def push(self, sample) -> bool:
+        """Add a sample, applying the backpressure policy when the ring is full."""
+        head = self._head
+        if head - self._tail >= self.capacity:
+            if self.policy == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            if self.policy == BLOCK:
+                self.blocked += 1
+                while head - self._tail >= self.capacity and not self.closed:
+                    self._writable.clear()
+                    self._writer_waiting = True
+                    if head - self._tail < self.capacity:
+                        break
+                    self._writable.wait(0.1)
+                self._writer_waiting = False
+                if self.closed:
+                    return False
+
+        self._slots[head % self.capacity] = sample
+        self._head = head + 1
+        depth = head + 1 - self._tail
+        if depth > self.max_depth:
+            self.max_depth = min(depth, self.capacity)
+        if self._reader_waiting:
+            self._readable.set()
+        return True
+
+    def pop_all(self) -> list:
+        """Take every sample currently in the ring, oldest first."""
+        tail = self._tail
+        head = self._head
+        if head - tail > self.capacity:
+            self.overwritten += head - self.capacity - tail
+            tail = head - self.capacity
+        slots = self._slots
+        capacity = self.capacity
+        samples = [slots[i % capacity] for i in range(tail, head)]
+
+        # Anything the producer lapped while we were copying is unreliable
+        lapped = self._head - capacity - tail
+        if lapped > 0:
+            self.overwritten += lapped
+            samples = samples[lapped:]
+
+        self._tail = head
+        if self._writer_waiting:
+            self._writable.set()
+        return samples
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until there is something to pop or the ring is closed."""
+        if self._head == self._tail and not self.closed:
+            self._readable.clear()
+            self._reader_waiting = True
+            if self._head == self._tail and not self.closed:
+                self._readable.wait(timeout)
+            self._reader_waiting = False
+        return self._head != self._tail
+
+    def close(self):
+        """Wake up both sides so they can finish."""
+        self.closed = True
+        self._readable.set()
+        self._writable.set()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "depth": len(self),
+            "max_depth": self.max_depth,
+            "pushed": self._head,
+            "dropped": self.dropped,
+            "overwritten": self.overwritten,
+            "blocked": self.blocked,
+        }
+
+
+class SamplePipeline:
+    """Serial reader thread feeding a MIDI writer thread through a SampleRing.
+
+    The reader drains and parses serial batches, the writer takes everything
+    queued, optionally coalesces it, and sends MIDI, so a slow MIDI driver no
+    longer stalls serial reads and vice versa.
+    """
+
+    def __init__(
+        self,
+        controller,
+        capacity: int = 1024,
+        policy: str = DROP_OLDEST,
+        coalesce: bool = False,
+        keep_note_changes: bool = False,
+    ):
+        self.controller = controller
+        self.ring = SampleRing(capacity, policy)
+        self.coalesce = coalesce
+        self.keep_note_changes = keep_note_changes
+        self.error = None
+
+        # Per-stage metrics
+        self.batches_read = 0
+        self.samples_read = 0
+        self.batches_sent = 0
+        self.samples_sent = 0
+        self.max_batch = 0
+
+    def run(self, ser):
+        """Run both stages until the controller powers off or the port fails."""
+        reader = threading.Thread(
+            target=self._read, args=(ser,), name="serial-reader", daemon=True
+        )
+        writer = threading.Thread(target=self._write, name="midi-writer", daemon=True)
+        if self.controller.latency is not None:
+            # Samples carry their own stamps across the ring
+            self.controller.latency.deferred = True
+        reader.start()
+        writer.start()
+        try:
+            # Join with a timeout so KeyboardInterrupt still reaches this thread
+            while reader.is_alive() or writer.is_alive():
+                reader.join(0.1)
+                if not reader.is_alive():
+                    writer.join(0.1)
+        finally:
+            if reader.is_alive():
+                # Interrupted, stop the reader. After a port error it has stopped
+                # already and the controller may reconnect.
+                self.controller.powered = False
+            self.ring.close()
+            reader.join()
+            writer.join()
+        if self.error is not None:
+            raise self.error
+
+    def _read(self, ser):
+        controller = self.controller
+        ring = self.ring
+        try:
+            while controller.powered:
+                samples = controller.parse_batch(controller.read_batch(ser))
+                latency = controller.latency
+                if samples and latency is not None:
+                    # The writer runs behind, so each sample carries its stamps
+                    stamps = (latency.read_ns, latency.parse_ns)
+                    samples = [sample + stamps for sample in samples]
+                if samples:
+                    self.batches_read += 1
+                    self.samples_read += len(samples)
+                    for sample in samples:
+                        ring.push(sample)
+        except Exception as e:
+            self.error = e
+        finally:
+            ring.close()
+
+    def _write(self):
+        controller = self.controller
+        ring = self.ring
+        try:
+            while ring.wait(0.1) or not ring.closed:
+                samples = ring.pop_all()
+                if not samples:
+                    continue
+                self.batches_sent += 1
+                self.samples_sent += len(samples)
+                if len(samples) > self.max_batch:
+                    self.max_batch = len(samples)
+                controller.send_samples(
+                    samples, self.coalesce, self.keep_note_changes
+                )
+        except Exception as e:
+            self.error = e
+            controller.powered = False
+            ring.close()
+
+    def stats(self) -> dict:
+        return {
+            "reader": {"batches": self.batches_read, "samples": self.samples_read},
+            "ring": self.ring.stats(),
+            "writer": {
+                "batches": self.batches_sent,
+                "samples": self.samples_sent,
+                "max_batch": self.max_batch,
+            },
+        }
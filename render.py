@@ -0,0 +1,70 @@
+import itertools
+
+from capture import CaptureReader, is_capture
+from midi_backends import MidiFileBackend
+from midimaker import MidiController
+
+
+def render(
+    source: str,
+    output: str,
+    midi_channel: int = 0,
+    rate: float = 100.0,
+    chunk_size: int = 1 << 16,
+) -> dict:
+    """Render a capture or a text log of sample lines to a Standard MIDI File.
+
+    Messages come from send_midi_messages, so the file has exactly the
+    note-ons, note-offs and retriggers a live run would send. Captures keep
+    their recorded timing. Text logs have none, so their samples are spaced
+    at rate per second. Input is read in chunks, so memory use does not grow
+    with the size of the source.
+    """
+    backend = MidiFileBackend(output)
+    controller = MidiController(source, midi_channel, backend)
+    samples = 0
+    try:
+        if is_capture(source):
+            with CaptureReader(source) as reader:
+                for timestamp, chunk in reader:
+                    backend.time_ns = timestamp
+                    batch = controller.parse_batch(controller.feed(chunk))
+                    controller.send_samples(batch)
+                    samples += len(batch)
+        else:
+            period_ns = int(1e9 / rate)
+            with open(source, "rb") as f:
+                # The extra newline completes a last line without one
+                chunks = iter(lambda: f.read(chunk_size), b"")
+                for chunk in itertools.chain(chunks, (b"\n",)):
+                    for midi_value, velocity in controller.parse_batch(
+                        controller.feed(chunk)
+                    ):
+                        backend.time_ns = samples * period_ns
+                        controller.apply_sample(midi_value, velocity)
+                        samples += 1
+    finally:
+        controller.close()
+    return {"samples": samples, "events": backend.events}
+
+
+def main():
+    import argparse
+    import logging
+
+    parser = argparse.ArgumentParser(description="Render sensor data to a MIDI file")
+    parser.add_argument("source", help="capture file or text log of sample lines")
+    parser.add_argument("output", help=".mid file to write")
+    parser.add_argument("--channel", type=int, default=0, help="0-based MIDI channel")
+    parser.add_argument(
+        "--rate", type=float, default=100.0, help="samples per second of a text log"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    stats = render(args.source, args.output, args.channel, args.rate)
+    print(f"Rendered {stats['samples']} samples as {stats['events']} events to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from typing import Optional
+
+import serial
+
+
+class SerialConfig:
+    """How to open and read the board's serial port.
+
+    baudrate matters for a real UART, USB CDC ports ignore it. A board
+    built with BINARY_OUTPUT sends its frames on the hardware UART, so
+    binary mode reads the port of the USB-UART adapter wired to it, at the
+    baud rate set in the board's UART settings. timeout bounds a blocking read and so how quickly the
+    read loop notices power_off(). inter_byte_timeout ends a read early
+    once the line goes quiet. read_size is how many bytes a read waits for
+    when nothing is buffered yet. low_latency asks the Linux driver to skip
+    its receive batching and exclusive locks the port against other
+    programs, both only where the platform supports them.
+    """
+
+    def __init__(
+        self,
+        baudrate: int = 9600,
+        timeout: Optional[float] = 1,
+        inter_byte_timeout: Optional[float] = None,
+        read_size: int = 1,
+        low_latency: bool = False,
+        exclusive: bool = False,
+    ):
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.inter_byte_timeout = inter_byte_timeout
+        self.read_size = max(1, read_size)
+        self.low_latency = low_latency
+        self.exclusive = exclusive
+
+    def open(
+        self,
+        port: str,
+        baudrate: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> serial.Serial:
+        """Open port with these settings, optionally overriding baud rate and timeout."""
+        kwargs = {}
+        if self.exclusive:
+            kwargs["exclusive"] = True
+        ser = serial.Serial(
+            port,
+            self.baudrate if baudrate is None else baudrate,
+            timeout=self.timeout if timeout is None else timeout,
+            inter_byte_timeout=self.inter_byte_timeout,
+            **kwargs,
+        )
+        if self.low_latency:
+            try:
+                ser.set_low_latency_mode(True)
+            except (AttributeError, NotImplementedError, ValueError) as e:
+                # Not Linux, or a device without ASYNC_LOW_LATENCY such as a pty
+                print(f"Low latency mode not available on {port}: {e}")
+        return ser
+
+    def __repr__(self):
+        return (
+            f"SerialConfig(baudrate={self.baudrate}, timeout={self.timeout},"
+            f" inter_byte_timeout={self.inter_byte_timeout},"
+            f" read_size={self.read_size}, low_latency={self.low_latency},"
+            f" exclusive={self.exclusive})"
+        )
+
+
+def measure_throughput(
+    config: SerialConfig,
+    rate: float = 5000.0,
+    seconds: float = 2.0,
+    profile: str = "wander",
+    binary: bool = False,
+    batch: bool = True,
+    track_latency: bool = False,
+) -> dict:
+    """Run the reader against the simulator with config and measure it.
+
+    Returns the samples per second that reached the MIDI stage, the share
+    of the simulator's samples that did, CPU time per sample and how long
+    the read loop took to stop after power_off(). With track_latency, the
+    read to MIDI send p99 in microseconds is added as read_to_send_p99_us.
+    batch=False reads line by line. A pty has no line rate, so this
+    measures the host side of each setting, not the baud rate.
+    """
+    import contextlib
+    import io
+    import threading
+    import time
+
+    from midi_backends import NullBackend
+    from midimaker import MidiController
+    from simulator import SimulatedBoard
+
+    class Controller(MidiController):
+        samples = 0
+
+        def apply_sample(self, *sample):
+            self.samples += 1
+            super().apply_sample(*sample)
+
+    with SimulatedBoard(rate, profile, seed=1, binary=binary) as board:
+        controller = Controller(board.port, backend=NullBackend(), config=config)
+        latency = controller.track_latency() if track_latency else None
+        stopped = []
+
+        def stop():
+            stopped.append(time.perf_counter())
+            controller.power_off()
+
+        timer = threading.Timer(seconds, stop)
+        start = time.perf_counter()
+        timer.start()
+        cpu = time.thread_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            controller.process_serial_data(batch=batch)
+        cpu = time.thread_time() - cpu
+        end = time.perf_counter()
+        sent = board.sent
+    result = {
+        "samples_per_s": controller.samples / (stopped[0] - start),
+        "kept_up_ratio": controller.samples / max(1, sent),
+        "cpu_ns_per_sample": cpu * 1e9 / max(1, controller.samples),
+        "shutdown_ms": (end - stopped[0]) * 1000,
+    }
+    if latency is not None:
+        result["read_to_send_p99_us"] = latency.read_to_send.percentile(99) / 1000
+    return result
+
+
+# Settings compared by default by the command line helper
+PRESETS = {
+    "default": SerialConfig(),
+    "short-timeout": SerialConfig(timeout=0.05),
+    "inter-byte": SerialConfig(timeout=0.05, inter_byte_timeout=0.002, read_size=256),
+    "fast": SerialConfig(
+        baudrate=921600, timeout=0.05, read_size=64, low_latency=True, exclusive=True
+    ),
+}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Measure serial settings against the simulated board"
+    )
+    parser.add_argument("presets", nargs="*", help=f"any of {', '.join(PRESETS)}")
+    parser.add_argument("--rate", type=float, default=5000.0, help="samples per second")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--binary", action="store_true", help="simulate binary frames")
+    args = parser.parse_args()
+    for name in args.presets:
+        if name not in PRESETS:
+            parser.error(f"unknown preset '{name}'")
+
+    print(f"{'preset':<15} {'samples/s':>10} {'kept up':>8} {'cpu ns':>8} {'stop ms':>8}")
+    for name in args.presets or PRESETS:
+        result = measure_throughput(PRESETS[name], args.rate, args.seconds, binary=args.binary)
+        print(
+            f"{name:<15} {result['samples_per_s']:>10.0f} {result['kept_up_ratio']:>8.3f}"
+            f" {result['cpu_ns_per_sample']:>8.0f} {result['shutdown_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import re
+from typing import List, Optional, Tuple
+
+from accel import AccelMapper
+
+# ANSI escape sequences the FREE-WILi console wraps around printed values
+ANSI_PATTERN = rb"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])"
+
+# Exactly one "%.1f %.1f\n" line from processAccelData in midi/main.cpp,
+# optionally behind the "0134"/"134" console prefix. Only the integer digits
+# are captured since they truncate exactly like int(float(...)). printFloat's
+# colour codes around each value are allowed, so the common case needs no
+# separate pass to strip them.
+_SGR = rb"(?:\x1b\[[0-9;]*m)*"
+WRAPPED_LINE = re.compile(
+    rb"^" + _SGR + rb"(?:0?134 )?" + _SGR + rb"(-?\d+)\.\d " + _SGR + rb"(-?\d+)\.\d"
+    + _SGR + rb"\r?$",
+    re.MULTILINE,
+)
+
+# "R x y z\n" raw accelerometer counts, printed instead of the two floats
+# when midi/main.cpp is built with RAW_OUTPUT
+RAW_LINE = re.compile(
+    rb"^(?:0?134 )?R (-?\d{1,6}) (-?\d{1,6}) (-?\d{1,6})\r?$", re.MULTILINE
+)
+# The same, but matching every line so findall returns one entry per line
+RAW_ROWS = re.compile(
+    rb"^(?:(?:0?134 )?R (-?\d{1,6}) (-?\d{1,6}) (-?\d{1,6})\r?|.*)$", re.MULTILINE
+)
+
+# Integer digits -> int for every value the firmware can print
+_INTS = {b"%d" % i: i for i in range(-255, 256)}
+_INTS[b"-0"] = 0
+
+ANSI_BYTES = re.compile(ANSI_PATTERN)
+ANSI_TEXT = re.compile(ANSI_PATTERN.decode("ascii"))
+
+
+def strip_ansi(data):
+    """Remove ANSI escape codes from str or bytes-like data.
+
+    Data without an ESC character is returned untouched, which is the common case.
+    """
+    if isinstance(data, str):
+        if "\x1b" not in data:
+            return data
+        return ANSI_TEXT.sub("", data)
+    # Searching for the int is much cheaper than for a one byte needle
+    if 0x1B not in data:
+        return data
+    return ANSI_BYTES.sub(b"", data)
+
+
+# Zero bytes around the buffer so fixed offsets from a line never leave it
+_PAD = bytes(8)
+
+
+def _parse_rows(np, data, starts, ends):
+    """Vectorised WRAPPED_LINE match for the stripped lines data[starts:ends].
+
+    Returns notes, velocities and a flag for the lines that matched with
+    at most 3 integer digits per value, the rest are left to the caller.
+    Every check is a gather at a fixed offset from the line's end or its
+    single space, so the cost is a handful of array operations per field.
+    """
+    # Drop a carriage return before the newline
+    ends = ends - ((ends > starts) & (data[ends - 1] == 13))
+    # Skip the optional "134 " or "0134 " console prefix
+    has4 = data[starts] == 49
+    for offset, byte in enumerate(b"34 ", 1):
+        has4 &= data[starts + offset] == byte
+    has5 = data[starts] == 48
+    for offset, byte in enumerate(b"134 ", 1):
+        has5 &= data[starts + offset] == byte
+    starts = starts + 4 * has4 + 5 * has5
+
+    # The velocity is "-?d{1,3}.d", so the space is 4 to 7 bytes from the end
+    space = np.full_like(ends, -1)
+    for offset in (7, 6, 5, 4):
+        space = np.where(data[ends - offset] == 32, ends - offset, space)
+    ok = space >= starts
+    space = np.maximum(space, starts)
+
+    negative = [data[starts] == 45, data[space + 1] == 45]
+    digits = [space - 2 - starts - negative[0], ends - 3 - space - negative[1]]
+    values = []
+    # Each field is the integer digits before a "." and one decimal digit
+    for dot, count, sign in zip((space - 2, ends - 2), digits, negative):
+        ok &= (data[dot] == 46) & (data[dot + 1] - 48 < 10)
+        ok &= (count >= 1) & (count <= 3)
+        value = np.zeros(len(ends), np.int64)
+        for place in range(3):
+            digit = (data[dot - 1 - place] - 48).astype(np.int64)
+            used = count > place
+            ok &= (digit < 10) | ~used
+            value += np.where(used, digit * 10**place, 0)
+        values.append(np.where(sign, -value, value))
+    return np.where(ok, values[0], 0), np.where(ok, values[1], 0), ok
+
+
+class LineParser:
+    """Parse firmware sample lines straight from bytes into (note, velocity).
+
+    Raw accelerometer lines are mapped to (note, velocity) with mapper.
+    """
+
+    def __init__(self, mapper: Optional[AccelMapper] = None):
+        self.mapper = mapper or AccelMapper()
+
+    def parse(self, line) -> Optional[Tuple[int, int]]:
+        """Parse one bytes-like line, returning None for blank lines.
+
+        Raises ValueError for lines that do not hold two numeric values.
+        """
+        match = WRAPPED_LINE.match(line)
+        if match is not None:
+            note, velocity = match.groups()
+            if note in _INTS and velocity in _INTS:
+                return _INTS[note], _INTS[velocity]
+        else:
+            match = RAW_LINE.match(strip_ansi(line))
+            if match is not None:
+                x, y, z = match.groups()
+                return self.mapper.sample(int(x), int(y), int(z))
+        return self.parse_slow(bytes(line))
+
+    def parse_many(self, block) -> Tuple[List[Tuple[int, int]], List[ValueError]]:
+        """Parse a block of newline separated lines in one pass.
+
+        Returns the parsed samples in order and the errors for any bad lines.
+        """
+        lines = block.count(b"\n") + 1
+        found = WRAPPED_LINE.findall(block)
+        if len(found) == lines:
+            # Every line is in the firmware format, which is the steady state
+            ints = _INTS
+            try:
+                return [(ints[note], ints[velocity]) for note, velocity in found], []
+            except KeyError:
+                pass
+        elif not found:
+            # One pass over the block removes printInt's colour codes everywhere
+            found = RAW_LINE.findall(strip_ansi(block))
+            if len(found) == lines:
+                # A board built with RAW_OUTPUT
+                sample = self.mapper.sample
+                return [sample(int(x), int(y), int(z)) for x, y, z in found], []
+
+        samples = []
+        errors = []
+        for line in bytes(block).split(b"\n"):
+            try:
+                sample = self.parse(line)
+            except ValueError as e:
+                errors.append(e)
+                continue
+            if sample is not None:
+                samples.append(sample)
+        return samples, errors
+
+    def parse_array(self, block):
+        """Parse a block of newline separated lines into NumPy arrays.
+
+        Returns notes, velocities and a validity flag with one entry per
+        line. Lines in the firmware format are converted with vectorised
+        operations and any other line goes through parse(). Blank and
+        malformed lines are flagged invalid.
+        """
+        import numpy as np
+
+        raw = bytes(block)
+        text = strip_ansi(raw)
+        stripped = text is not raw
+        if not text.endswith(b"\n"):
+            text += b"\n"
+        data = np.frombuffer(_PAD + text + _PAD, np.uint8)
+        ends = np.flatnonzero(data == 10)
+        starts = np.empty_like(ends)
+        starts[0] = len(_PAD)
+        starts[1:] = ends[:-1] + 1
+        notes, velocities, valid = _parse_rows(np, data, starts, ends)
+
+        invalid = np.flatnonzero(~valid)
+        if len(invalid) and b"R " in text:
+            # Raw accelerometer lines, mapped to notes all at once
+            fields = np.array(RAW_ROWS.findall(text)[: len(ends)])
+            raw_rows = fields[:, 0] != b""
+            if raw_rows.any():
+                x, y, z = fields[raw_rows].astype(np.int64).T
+                notes[raw_rows], velocities[raw_rows] = self.mapper.samples(x, y, z)
+                valid |= raw_rows
+                invalid = np.flatnonzero(~valid)
+        # Escape codes never span lines, so raw lines line up with the rows
+        if stripped and len(invalid):
+            lines = raw.split(b"\n")
+        for index in invalid:
+            if stripped:
+                line = lines[index]
+            else:
+                line = data[starts[index] : ends[index]].tobytes()
+            try:
+                sample = self.parse(line)
+                if sample is None:
+                    continue
+                notes[index], velocities[index] = sample
+            except (ValueError, OverflowError):
+                # Malformed, or a value too large for the arrays
+                continue
+            valid[index] = True
+        return notes, velocities, valid
+
+    def parse_slow(self, line: bytes) -> Optional[Tuple[int, int]]:
+        """Decode and parse a line the general way, for anything unusual."""
+        raw_data = line.decode("utf-8").strip()
+        if not raw_data:
+            return None
+
+        # Remove any prefixes and ANSI codes
+        data = raw_data.replace("0134", "").replace("134", "")
+        data = strip_ansi(data)
+
+        # Split the string on whitespace
+        parts = data.split()
+        if not parts:
+            # Nothing but colour codes, e.g. a reset after the newline
+            return None
+        if len(parts) < 2:
+            raise ValueError(f"not enough values in '{raw_data}'")
+        try:
+            return int(float(parts[0])), int(float(parts[1]))
+        except (ValueError, OverflowError) as e:
+            raise ValueError(
+                f"could not parse values from '{raw_data}' -> '{data}': {e}"
+            ) from None
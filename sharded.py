@@ -0,0 +1,325 @@
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+from midi_backends import MidiBackend, RtMidiBackend
+from multi_device import DeviceHost
+from serial_config import SerialConfig
+
+
+class SharedMessageRing:
+    """Single-producer, single-consumer ring of 3-byte MIDI messages in shared memory.
+
+    The block starts with two 64-bit counters, head (messages written,
+    advanced only by the producer) and tail (messages read, advanced only
+    by the consumer), followed by capacity 4-byte slots. A slot is filled
+    before head moves past it, so the consumer never sees a partial message.
+    The process that creates the ring owns the block and unlinks it.
+    """
+
+    SLOT = 4
+
+    def __init__(self, capacity: int = 1 << 14, name: Optional[str] = None):
+        self.capacity = capacity
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=16 + capacity * self.SLOT
+        )
+        self.name = self.shm.name
+        self._counters = self.shm.buf[:16].cast("Q")
+        self._slots = self.shm.buf[16 : 16 + capacity * self.SLOT]
+        if self.owner:
+            self._counters[0] = self._counters[1] = 0
+        self.full_waits = 0
+        self.dropped = 0
+
+    def push(self, message: bytes) -> bool:
+        """Append one message; False if the consumer has not freed a slot yet."""
+        head = self._counters[0]
+        if head - self._counters[1] >= self.capacity:
+            return False
+        offset = head % self.capacity * self.SLOT
+        self._slots[offset : offset + 3] = message
+        self._counters[0] = head + 1
+        return True
+
+    def put(self, message: bytes, timeout: float = 1.0) -> bool:
+        """Append one message, waiting up to timeout seconds for room."""
+        if self.push(message):
+            return True
+        self.full_waits += 1
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.0001)
+            if self.push(message):
+                return True
+        self.dropped += 1
+        return False
+
+    def drain(self) -> List[bytes]:
+        """Take every message written so far, oldest first."""
+        tail = self._counters[1]
+        head = self._counters[0]
+        if head == tail:
+            return []
+        slots = self._slots
+        capacity = self.capacity
+        messages = []
+        for index in range(tail, head):
+            offset = index % capacity * 4
+            messages.append(bytes(slots[offset : offset + 3]))
+        self._counters[1] = head
+        return messages
+
+    def __len__(self) -> int:
+        return self._counters[0] - self._counters[1]
+
+    def close(self):
+        if self._slots is None:
+            return
+        self._counters.release()
+        self._slots.release()
+        self._counters = self._slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingBackend(MidiBackend):
+    """Worker side of a shard: every message goes into the shard's shared ring.
+
+    A full ring makes the worker wait for the writer, so nothing is lost
+    while the writer keeps up; only a writer stalled for timeout seconds
+    makes messages count as dropped.
+    """
+
+    name = "ring"
+
+    def __init__(self, ring: SharedMessageRing, timeout: float = 1.0):
+        self.ring = ring
+        self.timeout = timeout
+
+    def send(self, message):
+        self.ring.put(message, self.timeout)
+
+
+def _serve_shard(
+    devices, ring_name, capacity, config, coalesce, keep_note_changes, stop, results
+):
+    """Worker process: read and parse one shard of boards into its ring."""
+    ring = SharedMessageRing(capacity, ring_name)
+    host = DeviceHost(RingBackend(ring), config)
+    threading.Thread(
+        target=lambda: (stop.wait(), host.power_off()), daemon=True
+    ).start()
+    start = time.monotonic()
+    try:
+        for port, channel in devices:
+            host.add(port, channel)
+        host.serve(coalesce, keep_note_changes)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        seconds = time.monotonic() - start
+        stats = host.device_stats(seconds)
+        host.close()
+        results.put((os.getpid(), stats, ring.full_waits, ring.dropped))
+        ring.close()
+
+
+class ShardedHost:
+    """Spread boards over worker processes, with one process writing all MIDI.
+
+    Each worker runs a DeviceHost over its shard of ports, so reading,
+    parsing and note decisions scale with cores. Workers send no MIDI
+    themselves: every message goes into the worker's own shared-memory
+    ring, and the parent drains the rings into the one real backend.
+    A board lives in exactly one worker and each ring is FIFO, so
+    messages from one board keep their order. All boards share the one
+    output, so there is room for 16 boards, each on its own channel.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[MidiBackend] = None,
+        config: Optional[SerialConfig] = None,
+        workers: Optional[int] = None,
+        ring_capacity: int = 1 << 14,
+    ):
+        self.backend = backend
+        self.config = config if config is not None else SerialConfig()
+        self.workers = workers or os.cpu_count() or 1
+        self.ring_capacity = ring_capacity
+        self.devices = []
+        self.messages = 0
+        self.full_waits = 0
+        self.dropped = 0
+        self.powered = True
+
+    def add(self, serial_port: str, midi_channel: Optional[int] = None):
+        """Queue a board for the next run; channels default to the next free one."""
+        used = {channel for _, channel in self.devices}
+        if midi_channel is None:
+            free = [channel for channel in range(16) if channel not in used]
+            if not free:
+                raise ValueError(
+                    f"All 16 MIDI channels of the output are taken, cannot add {serial_port}"
+                )
+            midi_channel = free[0]
+        elif midi_channel in used:
+            raise ValueError(
+                f"MIDI channel {midi_channel + 1} of the output is already taken"
+            )
+        self.devices.append((serial_port, midi_channel))
+
+    def power_off(self):
+        self.powered = False
+
+    def shards(self) -> List[list]:
+        """Boards dealt round-robin over at most one worker per board."""
+        count = max(1, min(self.workers, len(self.devices)))
+        return [self.devices[i::count] for i in range(count)]
+
+    def run(self, coalesce: bool = False, keep_note_changes: bool = False):
+        """Start the workers and write their MIDI until powered off or they all exit."""
+        if self.backend is None:
+            self.backend = RtMidiBackend()
+        stop = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        rings = []
+        processes = []
+        start = time.monotonic()
+        try:
+            for devices in self.shards():
+                ring = SharedMessageRing(self.ring_capacity)
+                rings.append(ring)
+                process = multiprocessing.Process(
+                    target=_serve_shard,
+                    args=(
+                        devices,
+                        ring.name,
+                        self.ring_capacity,
+                        self.config,
+                        coalesce,
+                        keep_note_changes,
+                        stop,
+                        results,
+                    ),
+                    daemon=True,
+                )
+                process.start()
+                processes.append(process)
+            print(f"Started {len(processes)} workers for {len(self.devices)} boards")
+            while self.powered and any(p.is_alive() for p in processes):
+                if not self.write(rings):
+                    time.sleep(0.0005)
+        except KeyboardInterrupt:
+            self.power_off()
+        finally:
+            stop.set()
+            stats = self._collect(processes, rings, results)
+            print(self.report(stats, time.monotonic() - start))
+            for ring in rings:
+                ring.close()
+            self.backend.close()
+
+    def write(self, rings: List[SharedMessageRing]) -> int:
+        """Send everything waiting in the rings; returns how many messages."""
+        send = self.backend.send
+        sent = 0
+        for ring in rings:
+            for message in ring.drain():
+                send(message)
+                sent += 1
+        self.messages += sent
+        return sent
+
+    def _collect(self, processes, rings, results) -> List[dict]:
+        """Keep writing while workers release their notes and exit, then gather stats."""
+        stats = []
+        waits = 0
+        pending = len(processes)
+        deadline = time.monotonic() + 5.0
+        while pending and time.monotonic() < deadline:
+            self.write(rings)
+            while not results.empty():
+                _, devices, full_waits, dropped = results.get()
+                stats.extend(devices)
+                waits += full_waits
+                self.dropped += dropped
+                pending -= 1
+            if pending:
+                time.sleep(0.001)
+        for process in processes:
+            process.join(1.0)
+        self.write(rings)
+        self.full_waits = waits
+        return stats
+
+    def report(self, stats: List[dict], seconds: float) -> str:
+        lines = [f"{'port':<20} {'ch':>3} {'samples':>9} {'per s':>8} {'errors':>6}"]
+        for device in sorted(stats, key=lambda d: d["port"]):
+            lines.append(
+                f"{device['port']:<20} {device['channel']:>3} {device['samples']:>9}"
+                f" {device['samples_per_s']:>8.1f} {device['errors']:>6}"
+            )
+        lines.append(
+            f"MIDI messages written: {self.messages}"
+            f", waits on a full ring: {self.full_waits}, dropped: {self.dropped}"
+        )
+        return "\n".join(lines)
+
+
+def main():
+    import argparse
+    import logging
+
+    from midi_backends import create_backend
+
+    parser = argparse.ArgumentParser(
+        description="Play many FREE-WILi boards, spread over worker processes"
+    )
+    parser.add_argument("ports", nargs="*", help="serial ports, one MIDI channel each")
+    parser.add_argument("--backend", default="rtmidi", help="MIDI backend name")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="worker processes, 0 for one per core"
+    )
+    parser.add_argument("--simulate", type=int, default=0, help="add N simulated boards")
+    parser.add_argument(
+        "--rate", type=float, default=100.0, help="simulated samples per second"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=0.0, help="seconds, 0 runs until Ctrl+C"
+    )
+    args = parser.parse_args()
+    if len(args.ports) + args.simulate > 16:
+        # Every board needs its own channel on the one MIDI output
+        parser.error(
+            f"{len(args.ports) + args.simulate} boards given, but one output has"
+            " 16 MIDI channels; use multi_device.py for more boards"
+        )
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    host = ShardedHost(create_backend(args.backend), workers=args.workers)
+    boards = []
+    if args.simulate:
+        from simulator import PROFILES, SimulatedBoard
+
+        profiles = sorted(PROFILES)
+        for i in range(args.simulate):
+            board = SimulatedBoard(args.rate, profiles[i % len(profiles)], seed=i)
+            boards.append(board.start())
+    for port in args.ports + [board.port for board in boards]:
+        host.add(port)
+    if args.duration:
+        threading.Timer(args.duration, host.power_off).start()
+    host.run()
+    for board in boards:
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
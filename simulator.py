@@ -0,0 +1,212 @@
+import math
+import os
+import random
+import threading
+import time
+import tty
+from typing import Callable, Dict, Optional, Tuple
+
+from accel import COUNTS_PER_G, ROLL_NOTES, note_for_roll, volume_for_pitch
+from framing import encode_frame
+
+
+def sweep(t: float, rng: random.Random) -> Tuple[float, float]:
+    """Roll swings across every note and back every 4 s, volume rises and falls."""
+    phase = t / 4.0 % 1.0
+    roll = -100.0 + 400.0 * phase if phase < 0.5 else 300.0 - 400.0 * phase
+    return roll, 30.0 * math.sin(2 * math.pi * t / 3.0)
+
+
+def scale(t: float, rng: random.Random) -> Tuple[float, float]:
+    """Hold each note of the scale for half a second, at a steady volume."""
+    step = int(t * 2) % len(ROLL_NOTES)
+    return -78.75 + 22.5 * step, 0.0
+
+
+def boundary(t: float, rng: random.Random) -> Tuple[float, float]:
+    """Hover around the -22.5 degree boundary with sensor jitter."""
+    return -22.5 + 2.0 * math.sin(2 * math.pi * t * 1.5) + rng.gauss(0, 1.0), 5.0
+
+
+def tremble(t: float, rng: random.Random) -> Tuple[float, float]:
+    """Hold one note while the volume jitters across the retrigger threshold."""
+    pitch = 15.0 * math.sin(2 * math.pi * t * 4) + rng.gauss(0, 3.0)
+    return 10.0 + rng.gauss(0, 0.5), pitch
+
+
+def wander(t: float, rng: random.Random) -> Tuple[float, float]:
+    """Smooth irregular motion over roll and pitch, like a hand moving freely."""
+    return 90.0 * math.sin(t * 0.7 + math.sin(t * 1.9)), 35.0 * math.sin(t * 1.3)
+
+
+PROFILES: Dict[str, Callable[[float, random.Random], Tuple[float, float]]] = {
+    "sweep": sweep,
+    "scale": scale,
+    "boundary": boundary,
+    "tremble": tremble,
+    "wander": wander,
+}
+
+
+class SimulatedBoard:
+    """FREE-WILi stand-in writing processAccelData lines into a pseudo-terminal.
+
+    Open port with MidiController like the real board. Lines are generated
+    from a gesture profile at the given rate, 10 Hz to 10 kHz, and are
+    written in bursts when the sample period is shorter than the sleep
+    granularity. Lines that do not fit into the pty because nobody reads
+    them are counted in dropped. With raw, the board prints accelerometer
+    counts as if built with RAW_OUTPUT, and with binary it writes frames as
+    if built with BINARY_OUTPUT.
+    """
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        profile: str = "sweep",
+        ansi: bool = True,
+        prefix: bool = True,
+        seed: Optional[int] = None,
+        raw: bool = False,
+        binary: bool = False,
+    ):
+        if profile not in PROFILES:
+            raise ValueError(
+                f"Unknown gesture profile '{profile}', expected one of {', '.join(PROFILES)}"
+            )
+        self.rate = rate
+        self.profile = PROFILES[profile]
+        self.ansi = ansi
+        self.prefix = prefix
+        self.raw = raw
+        self.binary = binary
+        self.sequence = 0
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.dropped = 0
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def line(self, t: float) -> bytes:
+        """Render the sample at t seconds the way the board prints it."""
+        roll, pitch = self.profile(t, self.rng)
+        if self.binary:
+            frame = encode_frame(
+                self.sequence, note_for_roll(roll), int(volume_for_pitch(pitch))
+            )
+            self.sequence = (self.sequence + 1) & 0xFF
+            return frame
+        if self.raw:
+            text = self.raw_line(roll, pitch)
+        else:
+            note = float(note_for_roll(roll))
+            volume = volume_for_pitch(pitch)
+            if self.ansi:
+                # printFloat wraps each value in the console colour codes
+                text = b"\x1b[30m%.1f \x1b[0m\x1b[30m%.1f\n\x1b[0m" % (note, volume)
+            else:
+                text = b"%.1f %.1f\n" % (note, volume)
+        if self.prefix:
+            text = b"0134 " + text
+        return text
+
+    def raw_line(self, roll: float, pitch: float) -> bytes:
+        """Accelerometer counts of a board held still at roll and pitch degrees."""
+        roll, pitch = math.radians(roll), math.radians(pitch)
+        x = round(-math.sin(pitch) * COUNTS_PER_G)
+        y = round(math.cos(pitch) * math.sin(roll) * COUNTS_PER_G)
+        z = round(math.cos(pitch) * math.cos(roll) * COUNTS_PER_G)
+        if self.ansi:
+            # printInt wraps each value in the console colour codes
+            line = b"\x1b[30mR %d \x1b[0m\x1b[30m%d \x1b[0m\x1b[30m%d\n\x1b[0m"
+        else:
+            line = b"R %d %d %d\n"
+        return line % (x, y, z)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="simulated-board", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        period = 1.0 / self.rate
+        start = time.perf_counter()
+        due = 0
+        while not self._stop.is_set():
+            elapsed = time.perf_counter() - start
+            target = int(elapsed * self.rate) + 1
+            if target > due:
+                chunk = b"".join(self.line(i * period) for i in range(due, target))
+                try:
+                    os.write(self._master, chunk)
+                    self.sent += target - due
+                except BlockingIOError:
+                    self.dropped += target - due
+                due = target
+            # Wake up once per sample, or every millisecond at high rates
+            self._stop.wait(max(0.001, due * period - (time.perf_counter() - start)))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulated FREE-WILi serial device")
+    parser.add_argument("--rate", type=float, default=100.0, help="samples per second")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="sweep")
+    parser.add_argument("--duration", type=float, default=0.0, help="seconds, 0 runs forever")
+    parser.add_argument("--no-ansi", action="store_true", help="omit ANSI colour codes")
+    parser.add_argument("--no-prefix", action="store_true", help="omit the 0134 prefix")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--raw", action="store_true", help="print accelerometer counts")
+    parser.add_argument("--binary", action="store_true", help="write binary frames")
+    args = parser.parse_args()
+
+    board = SimulatedBoard(
+        args.rate,
+        args.profile,
+        not args.no_ansi,
+        not args.no_prefix,
+        args.seed,
+        args.raw,
+        args.binary,
+    )
+    with board:
+        print(f"Simulated FREE-WILi on {board.port} ({args.rate:g} Hz, {args.profile})")
+        try:
+            if args.duration:
+                time.sleep(args.duration)
+            else:
+                while True:
+                    time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        print(f"Sent {board.sent} samples, dropped {board.dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import bisect
+import math
+from typing import Optional, Sequence, Tuple
+
+from accel import ROLL_NOTES
+
+
+def _alpha(cutoff: float, rate: float) -> float:
+    """Smoothing factor of a one-pole low-pass at cutoff Hz, sampled at rate Hz."""
+    return 1.0 / (1.0 + rate / (2.0 * math.pi * cutoff))
+
+
+class OneEuroFilter:
+    """Streaming One Euro filter: a low-pass whose cutoff rises with speed.
+
+    Slow movement is smoothed at min_cutoff Hz, which removes sensor
+    jitter, and every unit per second of (smoothed) speed adds beta Hz, so
+    a fast gesture is followed with little lag. d_cutoff smooths the speed
+    estimate itself. Samples are assumed to arrive at a steady rate, as
+    they do from processAccelData, so a call is a handful of float
+    operations on per-stream state and builds nothing per sample.
+    """
+
+    __slots__ = (
+        "rate",
+        "min_cutoff",
+        "beta",
+        "d_cutoff",
+        "_alpha_d",
+        "_period_hz",
+        "_ready",
+        "_raw",
+        "_value",
+        "_speed",
+    )
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        min_cutoff: float = 1.0,
+        beta: float = 0.0,
+        d_cutoff: float = 1.0,
+    ):
+        self.rate = rate
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._alpha_d = _alpha(d_cutoff, rate)
+        self._period_hz = rate / (2.0 * math.pi)
+        self.reset()
+
+    def reset(self):
+        """Forget the stream, the next value passes through unchanged."""
+        self._ready = False
+        self._raw = self._value = self._speed = 0.0
+
+    def __call__(self, value: float) -> float:
+        if not self._ready:
+            self._ready = True
+            self._raw = self._value = value
+            return value
+        rate = self.rate
+        # Speed comes from the raw values, as in the reference implementation
+        self._speed += self._alpha_d * ((value - self._raw) * rate - self._speed)
+        self._raw = value
+        cutoff = self.min_cutoff + self.beta * abs(self._speed)
+        self._value += (value - self._value) / (1.0 + self._period_hz / cutoff)
+        return self._value
+
+
+class SampleSmoother:
+    """One Euro filters for the note and velocity streams of one board.
+
+    Velocity is smoothed with min_cutoff and beta in velocity units. Notes
+    are smoothed with note_beta, as the ladder spans a dozen semitones
+    instead of 128 steps, then snapped to the nearest note of scale so a
+    smoothed note never falls between the ladder's notes. The unsnapped
+    value is kept in note_value. Pass smooth_notes=False to leave notes
+    alone.
+    """
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        min_cutoff: float = 1.0,
+        beta: float = 0.05,
+        d_cutoff: float = 1.0,
+        note_beta: float = 0.5,
+        smooth_notes: bool = True,
+        scale: Sequence[int] = ROLL_NOTES,
+    ):
+        self.velocity = OneEuroFilter(rate, min_cutoff, beta, d_cutoff)
+        self.note: Optional[OneEuroFilter] = None
+        if smooth_notes:
+            self.note = OneEuroFilter(rate, min_cutoff, note_beta, d_cutoff)
+        self.note_value = 0.0
+        self.scale = tuple(scale)
+        # Midpoints between neighbouring notes, a value on one rounds down
+        self._edges = tuple((a + b) / 2 for a, b in zip(self.scale, self.scale[1:]))
+
+    def reset(self):
+        self.velocity.reset()
+        if self.note is not None:
+            self.note.reset()
+
+    def __call__(self, note: int, velocity: int) -> Tuple[int, int]:
+        velocity = int(self.velocity(velocity) + 0.5)
+        if self.note is None:
+            self.note_value = note
+            return note, velocity
+        self.note_value = value = self.note(note)
+        return self.scale[bisect.bisect_left(self._edges, value)], velocity
+
+
+def one_euro(
+    values,
+    rate: float = 100.0,
+    min_cutoff: float = 1.0,
+    beta: float = 0.0,
+    d_cutoff: float = 1.0,
+):
+    """OneEuroFilter over a whole NumPy array at once, for offline captures.
+
+    Both filter stages are first-order recurrences, so each is solved in
+    closed form with cumulative products and sums, block by block to keep
+    the products within float range. Matches the streaming filter to
+    rounding error.
+    """
+    import numpy as np
+
+    x = np.asarray(values, dtype=np.float64)
+    if x.size < 2:
+        return x.copy()
+    speed_in = np.empty_like(x)
+    speed_in[0] = 0.0
+    np.multiply(np.diff(x), rate, out=speed_in[1:])
+    speed = _recurrence(np, speed_in, np.full(x.size, _alpha(d_cutoff, rate)))
+    cutoff = min_cutoff + beta * np.abs(speed)
+    alpha = 1.0 / (1.0 + rate / (2.0 * np.pi * cutoff))
+    return _recurrence(np, x, alpha)
+
+
+def _recurrence(np, x, alpha, span: float = 600.0):
+    """y[0] = x[0], y[i] = y[i-1] + alpha[i] * (x[i] - y[i-1])."""
+    y = np.empty_like(x)
+    y[0] = x[0]
+    # log of the running product of (1 - alpha), the decay applied to y[0]
+    decay = np.cumsum(np.log1p(-alpha[1:]))
+    weighted = alpha[1:] * x[1:]
+    start, n = 0, decay.size
+    while start < n:
+        base = decay[start - 1] if start else 0.0
+        # Stay within exp(span) of the block start so no product overflows
+        end = max(start + 1, int(np.searchsorted(-decay, span - base, "right")))
+        block = decay[start:end] - base
+        sums = np.cumsum(weighted[start:end] * np.exp(-block))
+        y[start + 1 : end + 1] = np.exp(block) * (y[start] + sums)
+        start = end
+    return y
+
+
+def smooth_arrays(
+    notes,
+    velocities,
+    rate: float = 100.0,
+    min_cutoff: float = 1.0,
+    beta: float = 0.05,
+    d_cutoff: float = 1.0,
+    note_beta: float = 0.5,
+    smooth_notes: bool = True,
+    scale: Sequence[int] = ROLL_NOTES,
+):
+    """SampleSmoother over note and velocity arrays, e.g. from parse_array."""
+    import numpy as np
+
+    velocities = np.floor(
+        one_euro(velocities, rate, min_cutoff, beta, d_cutoff) + 0.5
+    ).astype(np.int64)
+    if smooth_notes:
+        scale = np.asarray(scale)
+        edges = (scale[:-1] + scale[1:]) / 2
+        smoothed = one_euro(notes, rate, min_cutoff, note_beta, d_cutoff)
+        notes = scale[np.searchsorted(edges, smoothed, "left")]
+    return np.asarray(notes, dtype=np.int64), velocities
+
+
+def main():
+    import argparse
+    import time
+
+    import numpy as np
+
+    from capture import CaptureReader, is_capture
+    from midi_backends import RecordingBackend
+    from midimaker import MidiController
+    from serial_parser import LineParser
+
+    parser = argparse.ArgumentParser(
+        description="Compare the MIDI of a recording with and without smoothing"
+    )
+    parser.add_argument("source", help="capture file or text log of sample lines")
+    parser.add_argument("--rate", type=float, default=100.0, help="samples per second")
+    parser.add_argument("--min-cutoff", type=float, default=1.0, help="Hz at rest")
+    parser.add_argument(
+        "--beta", type=float, default=0.05, help="Hz added per velocity unit per second"
+    )
+    parser.add_argument(
+        "--note-beta", type=float, default=0.5, help="Hz added per semitone per second"
+    )
+    parser.add_argument("--d-cutoff", type=float, default=1.0, help="speed cutoff in Hz")
+    parser.add_argument("--no-notes", action="store_true", help="leave notes unsmoothed")
+    args = parser.parse_args()
+
+    if is_capture(args.source):
+        with CaptureReader(args.source) as reader:
+            data = b"".join(bytes(chunk) for _, chunk in reader)
+    else:
+        with open(args.source, "rb") as f:
+            data = f.read()
+    notes, velocities, valid = LineParser().parse_array(data)
+    notes, velocities = notes[valid], velocities[valid]
+
+    start = time.perf_counter()
+    smoothed = smooth_arrays(
+        notes,
+        velocities,
+        args.rate,
+        args.min_cutoff,
+        args.beta,
+        args.d_cutoff,
+        args.note_beta,
+        not args.no_notes,
+    )
+    seconds = time.perf_counter() - start
+
+    for name, (n, v) in (("raw", (notes, velocities)), ("smoothed", smoothed)):
+        backend = RecordingBackend()
+        controller = MidiController(args.source, backend=backend)
+        for sample in zip(n.tolist(), v.tolist()):
+            controller.apply_sample(*sample)
+        controller.close()
+        print(f"{name:>8}: {len(backend.messages)} MIDI messages")
+    print(f"Smoothed {notes.size} samples in {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()